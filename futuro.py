@@ -1,20 +1,53 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.utils import get_column_letter
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.packaging.custom import StringProperty
 import os
+import re
+import sys
+import json
+import argparse
+import unicodedata
+import uuid
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from copy import copy
+from itertools import islice
 from datetime import datetime, date, timedelta
 import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+import shutil
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+from futuro_pdf import TEMPLATE_VERSION, PdfContext, render_job
+try:
+    import python_calamine  # lecteur xlsx natif, optionnel (bien plus rapide)
+except ImportError:
+    python_calamine = None
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # ─── Config ────────────────────────────────────────────────────────────────────
-st.set_page_config(
+# Appliqués par main() : importer ce module (ligne de commande, processus de
+# rendu) ne fait aucun appel d'affichage Streamlit.
+PAGE_CONFIG = dict(
     page_title="Futuro Skills Academy",
     page_icon="🎓",
     layout="wide",
@@ -22,6 +55,22 @@ st.set_page_config(
 )
 
 EXCEL_FILE = "futuro_skills_data.xlsx"
+SQLITE_FILE = "futuro_skills_data.db"
+SEQUENCE_FILE = "futuro_skills_data.seq.json"
+LOCK_FILE = "futuro_skills_data.lock"
+SNAPSHOT_FILE = "futuro_skills_data.snapshot.pkl"
+JOURNAL_FILE = "futuro_skills_data.journal"
+JOURNAL_MAX_BYTES = 256 * 1024
+JOURNAL_MAX_AGE = 300  # secondes
+JOURNAL_MARKER = "futuro_journal"  # propriété du classeur : dernière entrée repliée
+PDF_CACHE_DIR = "futuro_pdf_cache"
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+ARCHIVE_DIR = "futuro_archives"
+ARCHIVE_SPOOL_BYTES = 16 * 1024 * 1024  # au-delà, l'archive passe sur disque
+EXPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# "excel" (par défaut), "journal" (écritures en ajout dans un journal, repliées
+# périodiquement dans le classeur) ou "sqlite" (le classeur n'est plus qu'un export)
+STORAGE_BACKEND = os.environ.get("FUTURO_STORAGE", "excel").lower()
 SHEETS = {
     "etudiants": "Étudiants",
     "groupes": "Groupes",
@@ -30,9 +79,31 @@ SHEETS = {
     "inscriptions": "Inscriptions",
     "presences": "Présences",
 }
+SCHEMA = {
+    "Étudiants": ["ID","Prénom","Nom","Email","Téléphone","Date Naissance",
+                  "Adresse","Groupe","Date Inscription","Frais Total","Statut Paiement"],
+    "Groupes": ["ID Groupe","Nom Groupe","Professeur","Niveau","Horaire",
+                "Salle","Date Début","Date Fin","Frais","Capacité Max","Nb Inscrits"],
+    "Professeurs": ["ID","Prénom","Nom","Email","Téléphone","Spécialité",
+                    "Taux Commission (%)","Groupes Assignés"],
+    "Paiements": ["ID Paiement","ID Étudiant","Nom Étudiant","Groupe",
+                  "Montant Payé","Montant Dû","Date Paiement","Mode Paiement","Statut","Notes"],
+    "Inscriptions": ["ID Inscription","ID Étudiant","Nom Complet","Groupe",
+                     "Professeur","Date Inscription","Frais","Statut"],
+    "Présences": ["ID","Groupe","Professeur","Date Séance","Numéro Séance",
+                  "ID Étudiant","Nom Étudiant","Statut","Commentaire"],
+}
+ID_COLUMNS = {
+    "Étudiants": "ID",
+    "Groupes": "ID Groupe",
+    "Professeurs": "ID",
+    "Paiements": "ID Paiement",
+    "Inscriptions": "ID Inscription",
+    "Présences": "ID",
+}
 
 # ─── Styles CSS ────────────────────────────────────────────────────────────────
-st.markdown("""
+CSS = """
 <style>
     [data-testid="stSidebar"] {
         background: linear-gradient(180deg, #1a1a2e 0%, #16213e 50%, #0f3460 100%);
@@ -85,90 +156,1527 @@ st.markdown("""
     .badge-red { background: #fed7d7; color: #9b2c2c; }
     .badge-orange { background: #feebc8; color: #7b341e; }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # ─── Excel Init ────────────────────────────────────────────────────────────────
+# 1 : classeurs d'origine (sans feuille Présences) ; 2 : schéma SCHEMA complet ;
+# 3 : lignes mises en forme par règles conditionnelles (plus de style par cellule)
+SCHEMA_VERSION = 3
+CORE_PROPS_NS = "{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}"
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_resource(show_spinner=False)
+def _schema_memo():
+    return {}  # chemin -> signature du fichier dont le schéma a été vérifié
+
+def workbook_schema_version(path=EXCEL_FILE):
+    # Lit uniquement docProps/core.xml dans l'archive, sans ouvrir le classeur
+    try:
+        with zipfile.ZipFile(path) as zf:
+            root = ElementTree.fromstring(zf.read("docProps/core.xml"))
+        return int(root.find(CORE_PROPS_NS + "version").text)
+    except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError,
+            AttributeError, TypeError, ValueError):
+        return 0
+
+def _save_atomic(wb, path):
+    tmp = path + ".tmp"
+    wb.save(tmp)
+    os.replace(tmp, path)
+
+def migrate_excel(path=EXCEL_FILE):
+    # Ajoute en une seule sauvegarde les feuilles et colonnes manquantes
+    with file_lock(LOCK_FILE):
+        if workbook_schema_version(path) >= SCHEMA_VERSION:
+            return  # migré entre-temps par un autre processus
+        wb = openpyxl.load_workbook(path)
+        for sheet, cols in SCHEMA.items():
+            if sheet not in wb.sheetnames:
+                ws = wb.create_sheet(sheet)
+                _style_header(ws, cols)
+                _style_rows(ws, len(cols))
+                continue
+            ws = wb[sheet]
+            headers = [c.value for c in ws[1]]
+            while headers and headers[-1] is None:
+                headers.pop()
+            missing = [c for c in cols if c not in headers]
+            if missing:
+                _style_header(ws, missing, start=len(headers) + 1)
+            _style_rows(ws, len(headers) + len(missing))
+        wb.properties.version = str(SCHEMA_VERSION)
+        _save_atomic(wb, path)
+
 def init_excel():
-    if not os.path.exists(EXCEL_FILE):
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
-
-        # Étudiants
-        ws = wb.create_sheet("Étudiants")
-        cols = ["ID","Prénom","Nom","Email","Téléphone","Date Naissance",
-                "Adresse","Groupe","Date Inscription","Frais Total","Statut Paiement"]
-        _style_header(ws, cols)
+    memo = _schema_memo()
+    sig = _file_signature(EXCEL_FILE)
+    if sig is not None and memo.get(EXCEL_FILE) == sig:
+        return
+    if sig is None:
+        with file_lock(LOCK_FILE):
+            if not os.path.exists(EXCEL_FILE):
+                wb = openpyxl.Workbook()
+                wb.remove(wb.active)
+                for sheet, cols in SCHEMA.items():
+                    ws = wb.create_sheet(sheet)
+                    _style_header(ws, cols)
+                    _style_rows(ws, len(cols))
+                wb.properties.version = str(SCHEMA_VERSION)
+                _save_atomic(wb, EXCEL_FILE)
+    elif workbook_schema_version(EXCEL_FILE) < SCHEMA_VERSION:
+        migrate_excel(EXCEL_FILE)
+    memo[EXCEL_FILE] = _file_signature(EXCEL_FILE)
+
+# ─── Styles du classeur ────────────────────────────────────────────────────────
+# Un seul style nommé pour les en-têtes, enregistré une fois par classeur, et une
+# mise en forme conditionnelle par feuille pour les lignes (zébrage + bordures) :
+# ajouter une ligne ne coûte plus aucun style de cellule.
+THIN_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                     top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_STYLE = NamedStyle(
+    name="futuro_header",
+    font=Font(bold=True, color="FFFFFF", size=11),
+    fill=PatternFill("solid", start_color="1a1a2e"),
+    alignment=Alignment(horizontal='center', vertical='center'),
+    border=THIN_BORDER,
+)
 
-        # Groupes
-        ws2 = wb.create_sheet("Groupes")
-        cols2 = ["ID Groupe","Nom Groupe","Professeur","Niveau","Horaire",
-                 "Salle","Date Début","Date Fin","Frais","Capacité Max","Nb Inscrits"]
-        _style_header(ws2, cols2)
-
-        # Professeurs
-        ws3 = wb.create_sheet("Professeurs")
-        cols3 = ["ID","Prénom","Nom","Email","Téléphone","Spécialité",
-                 "Taux Commission (%)","Groupes Assignés"]
-        _style_header(ws3, cols3)
-
-        # Paiements
-        ws4 = wb.create_sheet("Paiements")
-        cols4 = ["ID Paiement","ID Étudiant","Nom Étudiant","Groupe",
-                 "Montant Payé","Montant Dû","Date Paiement","Mode Paiement","Statut","Notes"]
-        _style_header(ws4, cols4)
-
-        # Inscriptions
-        ws5 = wb.create_sheet("Inscriptions")
-        cols5 = ["ID Inscription","ID Étudiant","Nom Complet","Groupe",
-                 "Professeur","Date Inscription","Frais","Statut"]
-        _style_header(ws5, cols5)
-
-        # Présences
-        ws6 = wb.create_sheet("Présences")
-        cols6 = ["ID","Groupe","Professeur","Date Séance","Numéro Séance",
-                 "ID Étudiant","Nom Étudiant","Statut","Commentaire"]
-        _style_header(ws6, cols6)
-
-        wb.save(EXCEL_FILE)
-    else:
-        # Add Présences sheet if missing (for existing files)
-        wb = openpyxl.load_workbook(EXCEL_FILE)
-        if "Présences" not in wb.sheetnames:
-            ws6 = wb.create_sheet("Présences")
-            cols6 = ["ID","Groupe","Professeur","Date Séance","Numéro Séance",
-                     "ID Étudiant","Nom Étudiant","Statut","Commentaire"]
-            _style_header(ws6, cols6)
-            wb.save(EXCEL_FILE)
-
-def _style_header(ws, cols):
-    header_fill = PatternFill("solid", start_color="1a1a2e")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
-    for i, col in enumerate(cols, 1):
+def _register_styles(wb):
+    if HEADER_STYLE.name not in wb.named_styles:
+        wb.add_named_style(copy(HEADER_STYLE))
+
+def _style_header(ws, cols, start=1):
+    _register_styles(ws.parent)
+    for i, col in enumerate(cols, start):
         cell = ws.cell(row=1, column=i, value=col)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
+        cell.style = HEADER_STYLE.name
         ws.column_dimensions[get_column_letter(i)].width = max(15, len(col) + 5)
     ws.row_dimensions[1].height = 30
 
-# ─── Lecture / Écriture Excel ──────────────────────────────────────────────────
+def _style_rows(ws, n_cols):
+    # Remplace les règles de la feuille : elle doit couvrir toutes les colonnes
+    last = get_column_letter(n_cols)
+    rng = f"A2:{last}1048576"
+    ws.conditional_formatting = ConditionalFormattingList()
+    ws.conditional_formatting.add(rng, FormulaRule(
+        formula=['AND($A2<>"",MOD(ROW(),2)=0)'],
+        fill=PatternFill(start_color="f8f9ff", end_color="f8f9ff", fill_type="solid"),
+        border=THIN_BORDER))
+    ws.conditional_formatting.add(rng, FormulaRule(formula=['$A2<>""'], border=THIN_BORDER))
+
+@contextmanager
+def file_lock(path):
+    # Verrou exclusif inter-processus (plusieurs serveurs Streamlit sur le même fichier)
+    with open(path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _compact_rows(ws, rows_to_delete):
+    # Supprime plusieurs lignes en une seule passe : chaque ligne conservée
+    # remonte une fois, au lieu d'un décalage complet par ws.delete_rows.
+    if not rows_to_delete:
+        return
+    rows_to_delete = set(rows_to_delete)
+    max_row, max_col = ws.max_row, ws.max_column
+    write = min(rows_to_delete)
+    for read in range(write, max_row + 1):
+        if read in rows_to_delete:
+            continue
+        if read != write:
+            for col in range(1, max_col + 1):
+                src = ws.cell(row=read, column=col)
+                dst = ws.cell(row=write, column=col)
+                dst.value = src.value
+                dst._style = copy(src._style)
+        write += 1
+    ws.delete_rows(write, max_row - write + 1)
+
+def _plain_value(val):
+    # Valeur Python simple (SQLite, JSON) : NaN -> None, numpy -> natif, dates -> texte
+    try:
+        if pd.isna(val):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(val, "item"):  # types numpy (int64, float64...)
+        return val.item()
+    if isinstance(val, (datetime, date)):
+        return str(val)
+    return val
+
+def _fold(text):
+    # minuscules sans accents : "Téléphone " -> "telephone"
+    text = unicodedata.normalize("NFKD", str(text).strip().lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def _full_row(sheet_name, row_data):
+    cols = SCHEMA[sheet_name]
+    row = [_plain_value(v) for v in row_data]
+    return row + [None] * (len(cols) - len(row))
+
+# ─── Lecture en flux (openpyxl read-only) ──────────────────────────────────────
+# Les valeurs sont lues directement (values_only) sans construire le modèle
+# objet complet du classeur ni les styles de cellules.
+def _iter_sheet_values(ws):
+    ws.reset_dimensions()  # ne pas se fier à la dimension déclarée du fichier
+    rows = ws.iter_rows(values_only=True)
+    header = list(next(rows, ()))
+    while header and header[-1] is None:
+        header.pop()
+    header = [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+    width = len(header)
+    def values():
+        for row in rows:
+            row = row[:width]
+            if any(v is not None for v in row):
+                yield row + (None,) * (width - len(row))
+    return header, values()
+
+def load_sheets_streaming(path, sheet_names):
+    frames = {}
+    if python_calamine is not None:
+        with pd.ExcelFile(path, engine="calamine") as xls:
+            for sheet in sheet_names:
+                if sheet in xls.sheet_names:
+                    frames[sheet] = xls.parse(sheet)
+        return frames
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in sheet_names:
+            if sheet in wb.sheetnames:
+                header, values = _iter_sheet_values(wb[sheet])
+                frames[sheet] = pd.DataFrame(list(values), columns=header)
+    finally:
+        wb.close()
+    return frames
+
+def iter_sheet_chunks(sheet_name, chunksize=5000, path=EXCEL_FILE):
+    # Parcours par blocs pour les grosses feuilles d'historique (Présences, Paiements)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        header, values = _iter_sheet_values(wb[sheet_name])
+        chunk = []
+        for row in values:
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        wb.close()
+
+# ─── Instantané binaire (démarrage à froid) ────────────────────────────────────
+class SheetSnapshot:
+    # Copie binaire des DataFrames (pickle pandas : blocs numpy par colonne) posée
+    # à côté du classeur. Utilisée tant qu'elle correspond au classeur (mtime /
+    # taille, ou à défaut empreinte SHA-1) ; reconstruite en arrière-plan sinon.
+    # Le fichier n'est écrit et relu que par l'application elle-même.
+
+    def __init__(self, source, path=SNAPSHOT_FILE):
+        self.source = source
+        self.path = path
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def _source_signature(self):
+        return _file_signature(self.source)
+
+    def _checksum(self):
+        h = hashlib.sha1()
+        with open(self.source, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def load(self):
+        sig = self._source_signature()
+        if sig is None or not os.path.exists(self.path):
+            return None
+        try:
+            meta, frames = pd.read_pickle(self.path)
+        except Exception:
+            return None
+        if meta["signature"] == sig:
+            return frames
+        # Fichier touché ou recopié sans changement de contenu
+        if meta["signature"][1] == sig[1] and meta["sha1"] == self._checksum():
+            return frames
+        return None
+
+    def _save(self, sig, frames):
+        checksum = self._checksum()
+        if self._source_signature() != sig:
+            return  # classeur modifié entre-temps : l'instantané serait faux
+        tmp = self.path + ".tmp"
+        pd.to_pickle(({"signature": sig, "sha1": checksum}, frames), tmp)
+        os.replace(tmp, self.path)
+
+    def _in_background(self, target, *args):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        def run():
+            try:
+                target(*args)
+            except Exception:
+                pass  # l'instantané n'est qu'une optimisation
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+        threading.Thread(target=run, name="futuro-snapshot", daemon=True).start()
+
+    def save_async(self, sig, frames):
+        # Démarrage à froid : toutes les feuilles viennent d'être lues, il ne reste qu'à les écrire
+        self._in_background(self._save, sig, frames)
+
+    def rebuild_async(self, delay=2.0):
+        self._in_background(self._rebuild, delay)
+
+    def _rebuild(self, delay):
+        # Attendre que les écritures se calment avant de relire tout le classeur
+        sig = self._source_signature()
+        while True:
+            time.sleep(delay)
+            current = self._source_signature()
+            if current == sig:
+                break
+            sig = current
+        if sig is not None:
+            self._save(sig, load_sheets_streaming(self.source, list(SCHEMA)))
+
+# ─── Opérations d'écriture ─────────────────────────────────────────────────────
+# Toute écriture est décrite par un dict sérialisable (journal, lots) :
+#   {"op": "append",       "sheet": ..., "rows": [[...], ...]}
+#   {"op": "update",       "sheet": ..., "id_col": ..., "updates": [[id, {col: val}], ...]}
+#   {"op": "delete",       "sheet": ..., "id_col": ..., "ids": [...]}
+#   {"op": "delete_where", "sheet": ..., "match": {col: val}}
+#   {"op": "replace",      "sheet": ..., "match": {col: val}, "rows": [[...], ...]}
+def _match_mask(df, match):
+    mask = pd.Series(True, index=df.index)
+    for col, val in match.items():
+        mask &= df[col].astype(str) == str(val)
+    return mask
+
+def apply_op_to_frame(df, op):
+    sheet, kind = op["sheet"], op["op"]
+    if kind in ("delete_where", "replace") and all(c in df.columns for c in op["match"]):
+        df = df[~_match_mask(df, op["match"])]
+    if kind in ("append", "replace") and op["rows"]:
+        new = pd.DataFrame(op["rows"], columns=SCHEMA[sheet])
+        df = new if df.empty else pd.concat([df, new.reindex(columns=df.columns)], ignore_index=True)
+    elif kind == "update":
+        df = df.reset_index(drop=True)
+        for id_val, updates in op["updates"]:
+            hits = df.index[df[op["id_col"]] == id_val]
+            if len(hits) == 0:
+                continue
+            for col, val in updates.items():
+                if col not in df.columns:
+                    continue
+                try:
+                    df.loc[hits[0], col] = val
+                except (TypeError, ValueError):
+                    df[col] = df[col].astype(object)
+                    df.loc[hits[0], col] = val
+    elif kind == "delete":
+        for id_val in op["ids"]:
+            hits = df.index[df[op["id_col"]] == id_val]
+            df = df.drop(hits[:1])
+    return df.reset_index(drop=True)
+
+def op_append(sheet_name, rows):
+    return {"op": "append", "sheet": sheet_name, "rows": [_full_row(sheet_name, r) for r in rows]}
+
+class StorageBackend:
+    # Les helpers publics construisent des opérations ; chaque moteur n'a qu'à
+    # implémenter apply(ops), qui les exécute en une seule écriture.
+    # Les observateurs (agrégats, index…) reçoivent ensuite les opérations écrites,
+    # avec la signature des données avant et après l'écriture.
+    # supports_query : le moteur sait paginer/trier/filtrer lui-même (query()).
+    _observers = ()
+    supports_query = False
+
+    def add_observer(self, observer):
+        self._observers = [*self._observers, observer]
+
+    def write(self, ops):
+        before = self.signature()
+        self.apply(ops)
+        self._notify(ops, before)
+
+    def _notify(self, ops, before, after=None):
+        after = self.signature() if after is None else after
+        for observer in self._observers:
+            observer(ops, before, after)
+
+    def append(self, sheet_name, row_data):
+        self.write([op_append(sheet_name, [row_data])])
+
+    def update_rows(self, sheet_name, id_col, updates_by_id):
+        self.write([{"op": "update", "sheet": sheet_name, "id_col": id_col,
+                     "updates": [[_plain_value(i), {c: _plain_value(v) for c, v in upd.items()}]
+                                 for i, upd in updates_by_id.items()]}])
+
+    def delete_rows(self, sheet_name, id_col, ids):
+        self.write([{"op": "delete", "sheet": sheet_name, "id_col": id_col,
+                     "ids": [_plain_value(i) for i in ids]}])
+
+    def delete_where(self, sheet_name, match):
+        self.write([{"op": "delete_where", "sheet": sheet_name,
+                     "match": {c: _plain_value(v) for c, v in match.items()}}])
+
+    def replace_rows(self, sheet_name, match, rows):
+        new_ids = self.reserve_ids(sheet_name, len(rows)) if rows else []
+        id_pos = SCHEMA[sheet_name].index(ID_COLUMNS[sheet_name])
+        full_rows = []
+        for row_id, row_data in zip(new_ids, rows):
+            row = _full_row(sheet_name, row_data)
+            row[id_pos] = row_id
+            full_rows.append(row)
+        self.write([{"op": "replace", "sheet": sheet_name,
+                     "match": {c: _plain_value(v) for c, v in match.items()}, "rows": full_rows}])
+        return new_ids
+
+# ─── Coordination des écritures ────────────────────────────────────────────────
+class WriteCoordinator:
+    # Écrivain unique du processus : les sessions déposent leurs lots d'opérations
+    # dans une file ; le thread écrivain prend tout ce qui attend et l'écrit en une
+    # seule sauvegarde (group commit). Chaque appelant attend son propre Future.
+
+    def __init__(self, commit):
+        self._commit = commit
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="futuro-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, ops):
+        fut = Future()
+        self._queue.put((ops, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._commit([ops for ops, _ in pending])
+            except Exception as exc:
+                if len(pending) == 1:
+                    pending[0][1].set_exception(exc)
+                    continue
+                # Un lot fautif ne doit pas faire échouer ceux des autres sessions
+                for ops, fut in pending:
+                    try:
+                        self._commit([ops])
+                    except Exception as exc_one:
+                        fut.set_exception(exc_one)
+                    else:
+                        fut.set_result(None)
+            else:
+                for _, fut in pending:
+                    fut.set_result(None)
+
+# ─── Moteur Excel ──────────────────────────────────────────────────────────────
+class ExcelBackend(StorageBackend):
+    def __init__(self, path, sequence_file=SEQUENCE_FILE, lock_file=LOCK_FILE):
+        self.path = path
+        self.sequence_file = sequence_file
+        self.lock_file = lock_file
+        self._lock = threading.RLock()
+        self._pk_index = {}  # (feuille, colonne ID) -> (signature, {id: n° de ligne})
+        self._writer = WriteCoordinator(self._commit)
+        self._snapshot = SheetSnapshot(path)
+
+    def init(self):
+        init_excel()
+
+    def _workbook_signature(self):
+        return _file_signature(self.path)
+
+    def signature(self):
+        return self._workbook_signature()
+
+    def _load_workbook_frames(self, sheet_names):
+        frames = self._snapshot.load()
+        if frames is not None:
+            return {s: frames[s] for s in sheet_names if s in frames}
+        sig = self._workbook_signature()
+        frames = load_sheets_streaming(self.path, sheet_names)
+        if set(SCHEMA) <= set(frames):
+            self._snapshot.save_async(sig, dict(frames))
+        else:
+            self._snapshot.rebuild_async()
+        return frames
+
+    def load(self, sheet_names):
+        return self._load_workbook_frames(sheet_names)
+
+    def _iter_chunks(self, sheet_name):
+        return iter_sheet_chunks(sheet_name, path=self.path)
+
+    def reserve_ids(self, sheet_name, n=1):
+        # Séquences persistées à côté du classeur : O(1) par allocation, jamais
+        # de réutilisation d'un ID supprimé. Amorcée une seule fois sur le max.
+        with self._lock, file_lock(self.lock_file):
+            try:
+                with open(self.sequence_file, encoding="utf-8") as fh:
+                    seqs = json.load(fh)
+            except (OSError, ValueError):
+                seqs = {}
+            start = seqs.get(sheet_name)
+            if start is None:
+                start = max((next_id(chunk, ID_COLUMNS[sheet_name])
+                             for chunk in self._iter_chunks(sheet_name)), default=1)
+            seqs[sheet_name] = start + n
+            tmp = self.sequence_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(seqs, fh, ensure_ascii=False)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.sequence_file)
+        return list(range(start, start + n))
+
+    def _row_index(self, ws, sheet_name, id_col, id_idx, refresh=False):
+        key = (sheet_name, id_col)
+        cached = self._pk_index.get(key)
+        if not refresh and cached is not None and cached[0] == self._workbook_signature():
+            return cached[1]
+        index = {}
+        for rn, (val,) in enumerate(ws.iter_rows(min_row=2, min_col=id_idx, max_col=id_idx,
+                                                 values_only=True), 2):
+            if val is not None:
+                index.setdefault(val, rn)
+        self._pk_index[key] = (self._workbook_signature(), index)
+        return index
+
+    def _locate(self, ws, sheet_name, id_col, ids):
+        headers = [cell.value for cell in ws[1]]
+        id_idx = headers.index(id_col) + 1
+        index = self._row_index(ws, sheet_name, id_col, id_idx)
+        found = {i: index.get(i) for i in ids}
+        if any(rn is None or ws.cell(row=rn, column=id_idx).value != i for i, rn in found.items()):
+            # Index périmé (fichier modifié ailleurs) : on le reconstruit une fois
+            index = self._row_index(ws, sheet_name, id_col, id_idx, refresh=True)
+            found = {i: index.get(i) for i in ids}
+        return headers, {i: rn for i, rn in found.items() if rn is not None}
+
+    def _drop_index(self, sheet_name):
+        for key in [k for k in self._pk_index if k[0] == sheet_name]:
+            self._pk_index.pop(key)
+
+    def _delete_matching(self, ws, match):
+        headers = [cell.value for cell in ws[1]]
+        if not all(col in headers for col in match):
+            return
+        idx = {col: headers.index(col) for col in match}
+        rows_to_delete = [
+            r[0].row for r in ws.iter_rows(min_row=2)
+            if all(str(r[idx[col]].value) == str(val) for col, val in match.items())
+        ]
+        _compact_rows(ws, rows_to_delete)
+
+    def _apply_op(self, wb, op):
+        sheet, kind = op["sheet"], op["op"]
+        ws = wb[sheet]
+        if kind in ("delete_where", "replace"):
+            self._delete_matching(ws, op["match"])
+            self._drop_index(sheet)
+        if kind in ("append", "replace"):
+            # Un ajout ne décale aucune ligne : l'index reste valable s'il existe
+            key = (sheet, ID_COLUMNS[sheet])
+            id_pos = SCHEMA[sheet].index(key[1])
+            headers = [cell.value for cell in ws[1]]
+            cols = SCHEMA[sheet]
+            # Classeur migré : les colonnes ajoutées peuvent être dans un autre ordre
+            aligned = headers[:len(cols)] == cols
+            pos = {c: i for i, c in enumerate(cols)}
+            for row in op["rows"]:
+                row_id = row[id_pos]
+                if not aligned:
+                    row = [row[pos[h]] if h in pos else None for h in headers]
+                ws.append(row)
+                if key in self._pk_index:
+                    self._pk_index[key][1].setdefault(row_id, ws.max_row)
+        elif kind == "update":
+            headers, found = self._locate(ws, sheet, op["id_col"], [i for i, _ in op["updates"]])
+            for id_val, updates in op["updates"]:
+                rn = found.get(id_val)
+                if rn is None:
+                    continue
+                for col_name, val in updates.items():
+                    if col_name in headers:
+                        ws.cell(row=rn, column=headers.index(col_name) + 1).value = val
+        elif kind == "delete":
+            _, found = self._locate(ws, sheet, op["id_col"], op["ids"])
+            _compact_rows(ws, found.values())
+            self._drop_index(sheet)
+
+    def _write(self, ops, marker=None):
+        before = self._workbook_signature()
+        wb = openpyxl.load_workbook(self.path)
+        for op in ops:
+            self._apply_op(wb, op)
+        if marker is not None:
+            _set_journal_marker(wb, marker)
+        # Sauvegarde atomique : un crash en cours d'écriture ne tronque jamais le classeur
+        _save_atomic(wb, self.path)
+        after = self._workbook_signature()
+        for key, (sig, index) in list(self._pk_index.items()):
+            if sig == before:
+                self._pk_index[key] = (after, index)
+
+    def _commit(self, batches):
+        # Appelé par le thread écrivain ; le verrou fichier protège des autres processus
+        with self._lock, file_lock(self.lock_file):
+            self._write([op for ops in batches for op in ops])
+
+    def apply(self, ops):
+        self._writer.submit(ops).result()
+
+# ─── Journal d'écriture (mode "journal") ───────────────────────────────────────
+def _set_journal_marker(wb, marker):
+    props = wb.custom_doc_props
+    if JOURNAL_MARKER in props.names:
+        del props[JOURNAL_MARKER]
+    props.append(StringProperty(name=JOURNAL_MARKER, value=marker))
+
+def _read_journal_marker(path):
+    # lue directement dans l'archive : pas besoin d'ouvrir tout le classeur
+    try:
+        with zipfile.ZipFile(path) as zf:
+            root = ElementTree.fromstring(zf.read("docProps/custom.xml"))
+    except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+        return None
+    for prop in root:
+        if prop.get("name") == JOURNAL_MARKER and len(prop):
+            return prop[0].text
+    return None
+
+class JournalBackend(ExcelBackend):
+    # Chaque écriture est ajoutée (et fsync) au journal ; les lectures rejouent le
+    # journal sur le classeur. La compaction replie le journal dans le .xlsx quand
+    # il dépasse une taille ou un âge donnés (et une fois au démarrage du processus).
+    # Chaque entrée porte un ID ; le classeur enregistre, dans la même sauvegarde
+    # atomique, celui de la dernière entrée repliée : si le processus s'arrête avant
+    # d'avoir supprimé le journal, ces entrées ne sont jamais rejouées deux fois.
+
+    def __init__(self, path, journal_file=JOURNAL_FILE,
+                 max_bytes=JOURNAL_MAX_BYTES, max_age=JOURNAL_MAX_AGE, **kwargs):
+        super().__init__(path, **kwargs)
+        self.journal_file = journal_file
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._base = (None, {}, None)  # (signature du classeur, DataFrames sans le journal, marque)
+        self._ready = False
+
+    def init(self):
+        # main() appelle init_storage() à chaque réexécution : on ne replie qu'une
+        # fois par processus, ensuite seuls les seuils déclenchent la compaction
+        if self._ready:
+            return
+        super().init()
+        self.compact()
+        self._ready = True
+
+    def _journal_signature(self):
+        return _file_signature(self.journal_file)
+
+    def signature(self):
+        wb_sig = self._workbook_signature()
+        return None if wb_sig is None else (wb_sig, self._journal_signature())
+
+    def _pending(self, entries, marker):
+        # entrées pas encore repliées dans le classeur (après la marque)
+        if marker is not None:
+            for i, entry in enumerate(entries):
+                if entry.get("id") == marker:
+                    return entries[i + 1:]
+        return entries
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_file, encoding="utf-8") as fh:
+                lines = fh.readlines()
+        except OSError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # ligne incomplète (crash pendant l'ajout) : ignorée
+        return entries
+
+    def load(self, sheet_names):
+        with self._lock:
+            wb_sig = self._workbook_signature()
+            if self._base[0] != wb_sig:
+                self._base = (wb_sig, {}, _read_journal_marker(self.path))
+            _, base, marker = self._base
+            missing = [s for s in sheet_names if s not in base]
+            if missing:
+                base.update(self._load_workbook_frames(missing))
+            frames = {s: base[s] for s in sheet_names if s in base}
+        for entry in self._pending(self._read_journal(), marker):
+            for op in entry["ops"]:
+                if op["sheet"] in frames:
+                    frames[op["sheet"]] = apply_op_to_frame(frames[op["sheet"]], op)
+        return frames
+
+    def _iter_chunks(self, sheet_name):
+        # Le journal peut contenir des lignes pas encore repliées dans le classeur
+        yield from self.load([sheet_name]).values()
+
+    def apply(self, ops):
+        # Valider avant d'écrire : une opération invalide bloquerait la compaction
+        for op in ops:
+            if op["sheet"] not in SCHEMA:
+                raise KeyError(op["sheet"])
+            if "id_col" in op and op["id_col"] not in SCHEMA[op["sheet"]]:
+                raise ValueError(f"{op['id_col']} is not in list")
+        super().apply(ops)
+
+    def write(self, ops):
+        # compaction après la notification : les vues voient d'abord l'écriture,
+        # puis un simple changement de signature
+        super().write(ops)
+        self._maybe_compact()
+
+    def _commit(self, batches):
+        # Un lot = une ligne (atomique au rejeu), un seul fsync pour tous les lots
+        data = "".join(json.dumps({"id": uuid.uuid4().hex, "ts": time.time(), "ops": ops},
+                                  ensure_ascii=False, default=str) + "\n"
+                       for ops in batches)
+        with self._lock, file_lock(self.lock_file):
+            with open(self.journal_file, "a+b") as fh:
+                # Isoler une éventuelle ligne tronquée par un crash précédent
+                if fh.tell() > 0:
+                    fh.seek(-1, os.SEEK_END)
+                    if fh.read(1) != b"\n":
+                        data = "\n" + data
+                fh.write(data.encode("utf-8"))
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def _maybe_compact(self):
+        size = (self._journal_signature() or (0, 0))[1]
+        entries = self._read_journal() if size < self.max_bytes else None
+        too_old = entries and time.time() - entries[0]["ts"] > self.max_age
+        if size >= self.max_bytes or too_old:
+            self.compact()
+
+    def compact(self):
+        with self._lock, file_lock(self.lock_file):
+            before = self.signature()
+            entries = self._read_journal()
+            pending = self._pending(entries, _read_journal_marker(self.path))
+            if pending:
+                self._write([op for entry in pending for op in entry["ops"]],
+                            marker=entries[-1].get("id"))
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            after = self.signature()
+        # Mêmes données, nouvelle signature : les vues et le cache la reprennent
+        # sans reconstruction (notifié hors du verrou, les vues lisent le moteur)
+        if after != before:
+            self._notify([], before, after)
+
+# ─── Moteur SQLite ─────────────────────────────────────────────────────────────
+SQL_TABLES = {sheet: key for key, sheet in SHEETS.items()}
+SQL_INDEXES = [
+    ("Étudiants", ["Groupe"]),
+    ("Groupes", ["Nom Groupe"]),
+    ("Groupes", ["Professeur"]),
+    ("Paiements", ["ID Étudiant"]),
+    ("Paiements", ["Groupe"]),
+    ("Inscriptions", ["ID Étudiant"]),
+    ("Présences", ["Groupe", "Date Séance"]),
+    ("Présences", ["ID Étudiant"]),
+]
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class SQLiteBackend(StorageBackend):
+    supports_query = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = None
+        self._ready = False
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
+
+    def _bump_version(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def init(self):
+        # Appelé à chaque rerun : une fois la base vérifiée, plus aucune requête
+        if self._ready:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+                conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+                conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', 0)")
+                schema_version = conn.execute(
+                    "SELECT value FROM meta WHERE key = 'schema_version'").fetchone()[0]
+                if schema_version < SCHEMA_VERSION:
+                    self._migrate(conn)
+            is_empty = all(
+                conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+                for table in SQL_TABLES.values())
+        # Première utilisation : reprendre les données du classeur existant
+        if is_empty and os.path.exists(EXCEL_FILE):
+            self.import_excel(EXCEL_FILE)
+        self._ready = True
+
+    def _migrate(self, conn):
+        # Tables, colonnes et index manquants, dans la même transaction
+        conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER)")
+        for sheet, cols in SCHEMA.items():
+            table = SQL_TABLES[sheet]
+            col_defs = ", ".join(
+                f"{_q(c)} INTEGER PRIMARY KEY" if c == ID_COLUMNS[sheet] else _q(c)
+                for c in cols)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({col_defs})")
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for col in cols:
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {_q(col)}")
+        for i, (sheet, cols) in enumerate(SQL_INDEXES):
+            table = SQL_TABLES[sheet]
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{i} "
+                         f"ON {table} ({', '.join(_q(c) for c in cols)})")
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", [SCHEMA_VERSION])
+
+    def import_excel(self, path):
+        frames = load_sheets_streaming(path, list(SCHEMA))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for sheet, df in frames.items():
+                    cols = [c for c in SCHEMA[sheet] if c in df.columns]
+                    if df.empty or not cols:
+                        continue
+                    rows = [[_plain_value(v) for v in rec]
+                            for rec in df[cols].itertuples(index=False, name=None)]
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {SQL_TABLES[sheet]} ({', '.join(_q(c) for c in cols)}) "
+                        f"VALUES ({', '.join('?' * len(cols))})", rows)
+                self._bump_version(conn)
+
+    def _reserve(self, conn, sheet_name, n):
+        # À appeler dans une transaction : l'INSERT prend le verrou d'écriture
+        # SQLite, ce qui sérialise les allocations entre processus.
+        table = SQL_TABLES[sheet_name]
+        conn.execute(f"INSERT OR IGNORE INTO sequences "
+                     f"SELECT ?, COALESCE(MAX({_q(ID_COLUMNS[sheet_name])}), 0) + 1 FROM {table}",
+                     [table])
+        conn.execute("UPDATE sequences SET value = value + ? WHERE name = ?", [n, table])
+        end = conn.execute("SELECT value FROM sequences WHERE name = ?", [table]).fetchone()[0]
+        return list(range(end - n, end))
+
+    def reserve_ids(self, sheet_name, n=1):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return self._reserve(conn, sheet_name, n)
+
+    def signature(self):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def load(self, sheet_names):
+        with self._lock:
+            conn = self._connect()
+            return {sheet: pd.read_sql_query(f"SELECT * FROM {SQL_TABLES[sheet]} ORDER BY rowid", conn)
+                    for sheet in sheet_names if sheet in SQL_TABLES}
+
+    def query(self, sheet_name, filters=None, sort_by=None, ascending=True, offset=0, limit=None):
+        cols = SCHEMA[sheet_name]
+        table = SQL_TABLES[sheet_name]
+        where, params = [], []
+        for col, val in (filters or {}).items():
+            if col not in cols:
+                continue
+            vals = list(val) if isinstance(val, (list, tuple, set)) else [val]
+            where.append(f"{_q(col)} IN ({', '.join('?' * len(vals))})" if vals else "0")
+            params += [_plain_value(v) for v in vals]
+        where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+        order = f"{_q(sort_by)} {'ASC' if ascending else 'DESC'}, rowid" if sort_by in cols else "rowid"
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}{where_sql}", params).fetchone()[0]
+            rows = pd.read_sql_query(
+                f"SELECT * FROM {table}{where_sql} ORDER BY {order} LIMIT ? OFFSET ?", conn,
+                params=params + [-1 if limit is None else limit, offset])
+        return rows, total
+
+    def _insert(self, conn, sheet_name, rows):
+        cols = SCHEMA[sheet_name]
+        conn.executemany(
+            f"INSERT INTO {SQL_TABLES[sheet_name]} ({', '.join(_q(c) for c in cols)}) "
+            f"VALUES ({', '.join('?' * len(cols))})", rows)
+
+    def _delete_matching(self, conn, sheet_name, match):
+        where = " AND ".join(f"CAST({_q(c)} AS TEXT) = ?" for c in match)
+        conn.execute(f"DELETE FROM {SQL_TABLES[sheet_name]} WHERE {where}",
+                     [str(v) for v in match.values()])
+
+    def _apply_op(self, conn, op):
+        sheet, kind = op["sheet"], op["op"]
+        table = SQL_TABLES[sheet]
+        if kind in ("delete_where", "replace"):
+            self._delete_matching(conn, sheet, op["match"])
+        if kind in ("append", "replace"):
+            self._insert(conn, sheet, op["rows"])
+        elif kind == "update":
+            for id_val, updates in op["updates"]:
+                updates = {c: v for c, v in updates.items() if c in SCHEMA[sheet]}
+                if not updates:
+                    continue
+                conn.execute(
+                    f"UPDATE {table} SET {', '.join(f'{_q(c)} = ?' for c in updates)} "
+                    f"WHERE rowid = (SELECT rowid FROM {table} WHERE {_q(op['id_col'])} = ? LIMIT 1)",
+                    list(updates.values()) + [id_val])
+        elif kind == "delete":
+            conn.executemany(
+                f"DELETE FROM {table} "
+                f"WHERE rowid = (SELECT rowid FROM {table} WHERE {_q(op['id_col'])} = ? LIMIT 1)",
+                [[i] for i in op["ids"]])
+
+    def apply(self, ops):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for op in ops:
+                    self._apply_op(conn, op)
+                self._bump_version(conn)
+
+# Sans spinner : comme _schema_memo et get_store, sert aussi à la ligne de
+# commande, hors de toute session Streamlit.
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(SQLITE_FILE)
+    if STORAGE_BACKEND == "journal":
+        return JournalBackend(EXCEL_FILE)
+    return ExcelBackend(EXCEL_FILE)
+
+def init_storage():
+    get_backend().init()
+
+# ─── Cache des feuilles (partagé entre sessions) ─────────────────────────────
+def query_frame(df, filters=None, sort_by=None, ascending=True, offset=0, limit=None):
+    # filters : {colonne: valeur ou liste de valeurs} ; renvoie (page, nombre total)
+    mask = pd.Series(True, index=df.index)
+    for col, val in (filters or {}).items():
+        if col in df.columns:
+            mask &= df[col].isin(val) if isinstance(val, (list, tuple, set)) else df[col] == val
+    rows = df[mask] if filters else df
+    if sort_by in rows.columns:
+        try:
+            rows = rows.sort_values(sort_by, ascending=ascending, kind="stable")
+        except TypeError:  # types mêlés dans la colonne
+            rows = rows.sort_values(sort_by, ascending=ascending, kind="stable", key=lambda c: c.astype(str))
+    end = None if limit is None else offset + limit
+    return rows.iloc[offset:end].copy(), len(rows)
+
+class SheetStore:
+    """Garde les DataFrames des feuilles en mémoire pour tout le processus.
+
+    Une feuille n'est relue que si la source a changé (mtime / taille du
+    classeur, version de la base SQLite) ou si nos helpers d'écriture
+    l'ont invalidée. Les lecteurs reçoivent une copie de la dernière version
+    complète, jamais un état intermédiaire d'une sauvegarde en cours.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.RLock()
+        self._frames = {}
+        self._signature = None
+        backend.add_observer(self._on_write)
+
+    def _on_write(self, ops, before, after):
+        # Écritures : invalidées par les helpers. Sans opération (compaction du
+        # journal), seule la signature change : on garde les feuilles en cache.
+        if not ops:
+            with self._lock:
+                if self._signature == before:
+                    self._signature = after
+
+    def _load_missing(self):
+        missing = [s for s in SHEETS.values() if s not in self._frames]
+        if not missing or self._signature is None:
+            return
+        self._frames.update(self.backend.load(missing))
+
+    def _frame(self, sheet_name):
+        # à appeler sous self._lock ; DataFrame partagé, ne pas modifier
+        sig = self.backend.signature()
+        if sig != self._signature:
+            # Source modifiée hors de nos helpers : on repart de zéro
+            self._frames = {}
+            self._signature = sig
+        if sheet_name not in self._frames:
+            self._load_missing()
+        return self._frames.get(sheet_name)
+
+    def get(self, sheet_name):
+        with self._lock:
+            df = self._frame(sheet_name)
+        return df.copy() if df is not None else pd.DataFrame()
+
+    def query(self, sheet_name, filters=None, sort_by=None, ascending=True, offset=0, limit=None):
+        # Une page de la feuille : le moteur la calcule lui-même s'il le sait
+        # (SQLite), sinon on découpe la feuille en cache sans la copier entière.
+        if self.backend.supports_query:
+            return self.backend.query(sheet_name, filters, sort_by, ascending, offset, limit)
+        with self._lock:
+            df = self._frame(sheet_name)
+            if df is None:
+                df = pd.DataFrame(columns=SCHEMA[sheet_name])
+            return query_frame(df, filters, sort_by, ascending, offset, limit)
+
+    def invalidate(self, sheet_names=None):
+        with self._lock:
+            if sheet_names is None:
+                self._frames = {}
+            else:
+                for sheet in sheet_names:
+                    self._frames.pop(sheet, None)
+            self._signature = self.backend.signature()
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    return SheetStore(get_backend())
+
+# ─── Vues incrémentales (agrégats, grand livre, recherche) ─────────────────────
+def _id_key(val):
+    val = _plain_value(val)
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return str(val)
+
+def _txt(val):
+    val = _plain_value(val)
+    return "" if val is None else str(val)
+
+def _num(val):
+    val = pd.to_numeric(_plain_value(val), errors="coerce")
+    return 0.0 if pd.isna(val) else float(val)
+
+class IncrementalView:
+    # Vue dérivée des feuilles, tenue à jour par les opérations d'écriture
+    # (observateur du moteur) au lieu d'être recalculée à chaque rendu.
+    # Si la source change sans passer par nos helpers (signature différente),
+    # ou si _apply() ne sait pas traiter une opération, on reconstruit tout.
+    SHEETS = ()
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.RLock()
+        self._signature = None
+        backend.add_observer(self._on_write)
+
+    def rebuild(self):
+        with self._lock:
+            sig = self.backend.signature()
+            frames = self.backend.load(list(self.SHEETS))
+            self._build({sheet: frames.get(sheet, pd.DataFrame()).reindex(columns=SCHEMA[sheet])
+                         for sheet in self.SHEETS})
+            # Une écriture a pu tomber pendant la lecture : on ne sait pas si ses
+            # lignes sont déjà comptées, la vue sera refaite à la prochaine lecture.
+            self._signature = sig if self.backend.signature() == sig else None
+
+    def _fresh(self):
+        if self._signature is None or self._signature != self.backend.signature():
+            self.rebuild()
+
+    def _on_write(self, ops, before, after):
+        with self._lock:
+            if self._signature != before:
+                # Vue reconstruite pendant l'écriture (elle contient déjà ces
+                # lignes) ou déjà périmée : on ne la corrige pas, on la refera.
+                self._signature = None
+                return
+            for op in ops:
+                if op["sheet"] in self.SHEETS and not self._apply(op):
+                    self._signature = None
+                    return
+            self._signature = after
+
+class DashboardStats(IncrementalView):
+    # Totaux et comptages du tableau de bord. Un petit index par ID garde la
+    # contribution de chaque ligne, de sorte qu'une mise à jour ou une
+    # suppression ne coûte que les lignes touchées. Une feuille peut contenir
+    # des IDs en double ou vides : chaque clé garde la liste de ses lignes dans
+    # l'ordre de la feuille, et, comme les moteurs, une mise à jour ou une
+    # suppression par ID ne touche que la première.
+
+    SHEETS = ("Étudiants", "Groupes", "Professeurs", "Paiements")
+    # colonnes retenues par ligne dans l'index (Groupes / Professeurs : comptage seul)
+    FIELDS = {"Étudiants": ("Prénom", "Nom", "Groupe", "Statut Paiement"),
+              "Paiements": ("Montant Dû", "Montant Payé"),
+              "Groupes": (), "Professeurs": ()}
+
+    def _build(self, frames):
+        self._rows = {sheet: {} for sheet in self.SHEETS}
+        self.lignes, self.statuts, self.groupes = Counter(), Counter(), Counter()
+        self.montant_du = self.montant_paye = 0.0
+        for sheet, df in frames.items():
+            self._add_rows(sheet, df.values.tolist())
+
+    def _entry(self, sheet, record):
+        # contribution d'une ligne, extraite une fois pour toutes
+        conv = _num if sheet == "Paiements" else _txt
+        return tuple(conv(record.get(c)) for c in self.FIELDS[sheet])
+
+    def _count(self, sheet, entry, sign):
+        self.lignes[sheet] += sign
+        if sheet == "Étudiants":
+            _, _, groupe, statut = entry
+            self.groupes[groupe] += sign
+            self.statuts[statut] += sign
+        elif sheet == "Paiements":
+            self.montant_du += sign * entry[0]
+            self.montant_paye += sign * entry[1]
+
+    def _add_rows(self, sheet, rows):
+        cols = SCHEMA[sheet]
+        id_pos = cols.index(ID_COLUMNS[sheet])
+        index = self._rows[sheet]
+        for row in rows:
+            entry = self._entry(sheet, dict(zip(cols, row)))
+            index.setdefault(_id_key(row[id_pos]), []).append(entry)
+            self._count(sheet, entry, +1)
+
+    def _remove(self, sheet, key):
+        lignes = self._rows[sheet].get(key)
+        if lignes:
+            self._count(sheet, lignes.pop(0), -1)
+            if not lignes:
+                del self._rows[sheet][key]
+
+    def _apply(self, op):
+        sheet = op["sheet"]
+        if op["op"] == "append":
+            self._add_rows(sheet, op["rows"])
+        elif op["op"] == "delete" and op["id_col"] == ID_COLUMNS[sheet]:
+            for id_val in op["ids"]:
+                self._remove(sheet, _id_key(id_val))
+        elif op["op"] == "update" and op["id_col"] == ID_COLUMNS[sheet]:
+            for id_val, updates in op["updates"]:
+                lignes = self._rows[sheet].get(_id_key(id_val))
+                if not lignes:
+                    continue
+                record = dict(zip(self.FIELDS[sheet], lignes[0]))
+                record.update(updates)
+                self._count(sheet, lignes[0], -1)
+                lignes[0] = entry = self._entry(sheet, record)
+                self._count(sheet, entry, +1)
+        else:
+            return False  # correspondance sur des colonnes non indexées
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            self._fresh()
+            etudiants = self._rows["Étudiants"]
+            return {
+                "nb_etudiants": self.lignes["Étudiants"],
+                "nb_groupes": self.lignes["Groupes"],
+                "nb_professeurs": self.lignes["Professeurs"],
+                "montant_du": self.montant_du,
+                "montant_paye": self.montant_paye,
+                "statuts": {k: v for k, v in self.statuts.items() if k and v > 0},
+                "groupes": {k: v for k, v in self.groupes.items() if k and v > 0},
+                "impayes": list(islice(((f"{prenom} {nom}", grp)
+                                        for lignes in etudiants.values()
+                                        for prenom, nom, grp, statut in lignes
+                                        if statut == "Impayé"), 5)),
+            }
+
+@st.cache_resource
+def get_stats():
+    return DashboardStats(get_backend())
+
+class PaymentLedger(IncrementalView):
+    # Grand livre par étudiant (clé : ID Étudiant) : total payé, montant dû,
+    # solde, date du dernier paiement et nombre de paiements. Chaque paiement
+    # ajouté/modifié/supprimé ne recalcule que l'étudiant concerné, avec le même
+    # calcul que la construction. Montant Dû est répété sur chaque paiement : on
+    # garde le max. Un ID Paiement peut revenir sur plusieurs lignes : elles
+    # comptent toutes, et une mise à jour ou une suppression par ID ne touche que
+    # la première, comme dans les moteurs.
+
+    SHEETS = ("Paiements",)
+
+    def _build(self, frames):
+        cols = SCHEMA["Paiements"]
+        self._payments, self._by_student, self._ledger = {}, {}, {}
+        for row in frames["Paiements"].values.tolist():
+            self._add(_id_key(row[cols.index("ID Paiement")]), self._entry(dict(zip(cols, row))))
+        for sid in self._by_student:
+            self._recompute(sid)
+
+    def _entry(self, record):
+        return (_id_key(record.get("ID Étudiant")), _num(record.get("Montant Payé")),
+                _num(record.get("Montant Dû")), _txt(record.get("Date Paiement")))
+
+    def _add(self, pid, entry):
+        # _payments : ID Paiement -> lignes dans l'ordre de la feuille
+        self._payments.setdefault(pid, []).append(entry)
+        self._by_student.setdefault(entry[0], []).append(entry)
+
+    def _drop(self, entry):
+        self._by_student[entry[0]].remove(entry)
+
+    def _recompute(self, sid):
+        rows = self._by_student.get(sid)
+        if rows:
+            self._ledger[sid] = (sum(r[1] for r in rows), max(r[2] for r in rows),
+                                 max(r[3] for r in rows), len(rows))
+        else:
+            self._by_student.pop(sid, None)
+            self._ledger.pop(sid, None)
+
+    def _apply(self, op):
+        cols = SCHEMA["Paiements"]
+        touched = set()
+        if op["op"] == "append":
+            for row in op["rows"]:
+                entry = self._entry(dict(zip(cols, row)))
+                self._add(_id_key(row[cols.index("ID Paiement")]), entry)
+                touched.add(entry[0])
+        elif op["op"] == "delete" and op["id_col"] == "ID Paiement":
+            for id_val in op["ids"]:
+                pid = _id_key(id_val)
+                lignes = self._payments.get(pid)
+                if not lignes:
+                    continue
+                old = lignes.pop(0)
+                if not lignes:
+                    del self._payments[pid]
+                self._drop(old)
+                touched.add(old[0])
+        elif op["op"] == "update" and op["id_col"] == "ID Paiement":
+            for id_val, updates in op["updates"]:
+                lignes = self._payments.get(_id_key(id_val))
+                if not lignes:
+                    continue
+                old = lignes[0]
+                record = dict(zip(("ID Étudiant", "Montant Payé", "Montant Dû", "Date Paiement"), old))
+                record.update(updates)
+                lignes[0] = entry = self._entry(record)
+                self._drop(old)
+                self._by_student.setdefault(entry[0], []).append(entry)
+                touched.update((old[0], entry[0]))
+        else:
+            return False
+        for sid in touched:
+            self._recompute(sid)
+        return True
+
+    def get(self, student_id):
+        with self._lock:
+            self._fresh()
+            paye, du, dernier, nb = self._ledger.get(_id_key(student_id), (0.0, 0.0, "", 0))
+        return {"Total Payé": paye, "Montant Dû": du, "Solde": du - paye,
+                "Dernier Paiement": dernier, "Nb Paiements": nb}
+
+@st.cache_resource
+def get_ledger():
+    return PaymentLedger(get_backend())
+
+class SearchIndex(IncrementalView):
+    # Index de recherche d'une feuille : chaque champ texte est normalisé
+    # (minuscules, sans accents) puis découpé en jetons ; chaque préfixe de jeton
+    # (n-grammes de tête) pointe vers les IDs qui le contiennent. Une requête
+    # intersecte les ensembles de ses jetons, puis classe les lignes : jeton
+    # exact avant simple préfixe, champs de nom avant les autres.
+
+    MAX_PREFIX = 12
+
+    def __init__(self, backend, sheet_name, fields):
+        self.SHEETS = (sheet_name,)
+        self.sheet = sheet_name
+        self.id_col = ID_COLUMNS[sheet_name]
+        self.fields = fields  # {colonne: poids}
+        super().__init__(backend)
+
+    def _tokens(self, record):
+        # {jeton: meilleur poids}
+        tokens = {}
+        for col, weight in self.fields.items():
+            text = _fold(_txt(record.get(col)))
+            words = re.findall(r"[a-z0-9]+", text)
+            if col == "Téléphone" and words:
+                words.append("".join(words))  # "06 12 34..." cherchable en "0612"
+            for word in words:
+                tokens[word] = max(tokens.get(word, 0), weight)
+        return tokens
+
+    def _add(self, key, record):
+        tokens = self._tokens(record)
+        self._docs[key] = ({c: record.get(c) for c in self.fields}, tokens)
+        for word, weight in tokens.items():
+            self._exact.setdefault(word, {})[key] = weight
+            for n in range(1, min(len(word), self.MAX_PREFIX) + 1):
+                ids = self._prefixes.setdefault(word[:n], {})
+                ids[key] = max(ids.get(key, 0), weight)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for word in doc[1]:
+            for index, entry in [(self._exact, word)] + [(self._prefixes, word[:n])
+                                                          for n in range(1, min(len(word), self.MAX_PREFIX) + 1)]:
+                ids = index.get(entry)
+                if ids is not None:
+                    ids.pop(key, None)
+                    if not ids:
+                        del index[entry]
+
+    def _build(self, frames):
+        self._docs, self._exact, self._prefixes = {}, {}, {}
+        df = frames[self.sheet]
+        cols = list(self.fields)
+        for key, values in zip(df[self.id_col].map(_id_key), df[cols].values.tolist()):
+            self._add(key, dict(zip(cols, values)))
+
+    def _apply(self, op):
+        cols = SCHEMA[self.sheet]
+        if op["op"] == "append":
+            for row in op["rows"]:
+                record = dict(zip(cols, row))
+                self._add(_id_key(record[self.id_col]), record)
+        elif op["op"] == "delete" and op["id_col"] == self.id_col:
+            for id_val in op["ids"]:
+                self._remove(_id_key(id_val))
+        elif op["op"] == "update" and op["id_col"] == self.id_col:
+            for id_val, updates in op["updates"]:
+                key = _id_key(id_val)
+                if key in self._docs:
+                    record = {**self._docs[key][0], **updates}
+                    self._remove(key)
+                    self._add(key, record)
+        else:
+            return False
+        return True
+
+    def search(self, query, limit=None):
+        # IDs (clés texte) classés par pertinence
+        words = re.findall(r"[a-z0-9]+", _fold(query))
+        if not words:
+            return []
+        with self._lock:
+            self._fresh()
+            hits = None
+            for word in words:
+                ids = self._prefixes.get(word[:self.MAX_PREFIX], {})
+                if len(word) > self.MAX_PREFIX:  # préfixe tronqué : on vérifie les jetons
+                    ids = {k: w for k, w in ids.items()
+                           if any(t.startswith(word) for t in self._docs[k][1])}
+                hits = ids.keys() if hits is None else hits & ids.keys()
+                if not hits:
+                    return []
+            scored = []
+            for key in hits:
+                # jeton exact : 3 x poids du champ ; simple préfixe : poids du champ
+                score = 0
+                for w in words:
+                    exact = self._exact.get(w, {})
+                    score += 3 * exact[key] if key in exact else self._prefixes[w[:self.MAX_PREFIX]][key]
+                scored.append((-score, key))
+        scored.sort()
+        return [key for _, key in scored[:limit]]
+
+SEARCH_FIELDS = {
+    "Étudiants": {"Prénom": 3, "Nom": 3, "Email": 2, "Téléphone": 1, "Groupe": 1},
+    "Inscriptions": {"Nom Complet": 3, "Groupe": 1, "Professeur": 1, "Statut": 1},
+}
+
+@st.cache_resource
+def get_search_index(sheet_name):
+    return SearchIndex(get_backend(), sheet_name, SEARCH_FIELDS[sheet_name])
+
+def _id_keys(series):
+    # version vectorisée de _id_key pour une colonne d'IDs
+    num = pd.to_numeric(series, errors="coerce")
+    whole = num.notna() & (num % 1 == 0)
+    keys = series.astype(str)
+    keys[whole] = num[whole].astype("int64").astype(str)
+    return keys
+
+def search_frame(df, sheet_name, query):
+    # lignes de df correspondant à la requête, dans l'ordre de pertinence
+    ranked = get_search_index(sheet_name).search(query)
+    if not ranked or df.empty:
+        return df.iloc[0:0]
+    rank = pd.Series(range(len(ranked)), index=ranked)
+    pos = _id_keys(df[ID_COLUMNS[sheet_name]]).map(rank)
+    return df[pos.notna()].iloc[pos.dropna().argsort()]
+
+# ─── Analyse des présences ────────────────────────────────────────────────────
+STATUTS_PRESENCE = ["Présent", "Absent", "Retard", "Excusé"]
+AT_RISK_RATE = 70    # % de présence en dessous duquel un étudiant est signalé
+AT_RISK_STREAK = 3   # absences consécutives (séances les plus récentes)
+
+class AttendanceCube(IncrementalView):
+    # Présences codées une fois pour toutes : étudiant, séance (groupe + date) et
+    # statut deviennent des entiers (factorize), ce qui forme la matrice
+    # étudiant × séance sous forme creuse (une ligne par case remplie). Taux et
+    # séries se calculent ensuite par bincount / groupby sur ces codes.
+    # Reconstruit paresseusement à la première lecture après une écriture.
+    # Taux de présence = (Présent + Retard) / séances hors Excusé.
+
+    SHEETS = ("Présences",)
+
+    def _build(self, frames):
+        df = frames["Présences"]
+        status = pd.Categorical(df["Statut"], categories=STATUTS_PRESENCE).codes
+        keep = status >= 0
+        df = df[keep]
+        dates = pd.to_datetime(df["Date Séance"], errors="coerce")
+        student, self._students = pd.factorize(_id_keys(df["ID Étudiant"]))
+        session, self._sessions = pd.factorize(df["Groupe"].astype(str) + "|" + df["Date Séance"].astype(str))
+        self._facts = pd.DataFrame({
+            "etudiant": student.astype("int32"),
+            "seance": session.astype("int32"),
+            "statut": status[keep].astype("int8"),
+            "date": dates.values,
+            "Groupe": df["Groupe"].astype("category").values,
+            "Professeur": df["Professeur"].astype("category").values,
+        })
+        # nom et groupe de chaque étudiant (dernière occurrence)
+        self._names = (pd.DataFrame({"etudiant": student, "Nom Étudiant": df["Nom Étudiant"].values,
+                                     "Groupe": df["Groupe"].values})
+                       .drop_duplicates("etudiant", keep="last").set_index("etudiant").sort_index())
+
+    def _apply(self, op):
+        return False  # recalcul complet à la prochaine lecture
+
+    def _counts(self, keys):
+        # tableau (clé × statut) en un seul bincount
+        codes, labels = pd.factorize(keys, sort=True)
+        valid = codes >= 0
+        n = len(labels)
+        flat = np.bincount(codes[valid] * 4 + self._facts["statut"].values[valid], minlength=n * 4)
+        counts = pd.DataFrame(flat.reshape(n, 4), index=labels, columns=STATUTS_PRESENCE)
+        counts.insert(0, "Séances", counts.sum(axis=1))
+        suivies = counts["Présent"] + counts["Absent"] + counts["Retard"]
+        counts["Taux (%)"] = ((counts["Présent"] + counts["Retard"]) / suivies.where(suivies > 0) * 100).round(1)
+        return counts
+
+    def rates(self, by):
+        # by : "Étudiant", "Groupe", "Professeur", "Semaine" ou "Mois"
+        with self._lock:
+            self._fresh()
+            facts = self._facts
+            if by == "Étudiant":
+                counts = self._counts(facts["etudiant"].values)
+                counts = self._names.join(counts, how="inner")
+                counts.index = self._students[counts.index]
+                counts.index.name = "ID Étudiant"
+                return counts
+            if by == "Semaine":
+                keys = facts["date"].dt.to_period("W-SUN").dt.start_time
+            elif by == "Mois":
+                keys = facts["date"].dt.to_period("M").astype(str)
+            else:
+                keys = facts[by].astype(object)
+            counts = self._counts(keys)
+            counts.index.name = by
+            return counts
+
+    def streaks(self):
+        # séries d'absences consécutives par étudiant, dans l'ordre des séances
+        # (Excusé est neutre : ni absence, ni rupture de série)
+        with self._lock:
+            self._fresh()
+            facts = self._facts[self._facts["statut"] != STATUTS_PRESENCE.index("Excusé")]
+            facts = facts.sort_values(["etudiant", "date"], kind="stable")
+            absent = facts["statut"].values == STATUTS_PRESENCE.index("Absent")
+            student = facts["etudiant"].values
+            new_run = ~absent | np.r_[True, student[1:] != student[:-1]]
+            run = np.cumsum(new_run)
+            length = pd.Series(absent.astype(int)).groupby(run).cumsum().values
+            last = np.r_[student[1:] != student[:-1], True] if len(student) else np.array([], dtype=bool)
+            out = pd.DataFrame({
+                "Plus longue série": pd.Series(length).groupby(student).max(),
+                "Série en cours": pd.Series(length[last], index=student[last]),
+            }).fillna(0).astype(int)
+            out.index = self._students[out.index]
+            out.index.name = "ID Étudiant"
+            return out
+
+    def at_risk(self, min_rate=AT_RISK_RATE, min_streak=AT_RISK_STREAK):
+        table = self.rates("Étudiant").join(self.streaks())
+        flagged = (table["Taux (%)"] < min_rate) | (table["Série en cours"] >= min_streak)
+        return table[flagged].sort_values(["Série en cours", "Taux (%)"], ascending=[False, True])
+
+    def matrix(self, groupe):
+        # matrice étudiant × date d'un groupe (statuts), pour affichage
+        with self._lock:
+            self._fresh()
+            facts = self._facts[self._facts["Groupe"] == groupe]
+            grid = pd.DataFrame({
+                "Nom Étudiant": self._names["Nom Étudiant"].reindex(facts["etudiant"]).values,
+                "Date": facts["date"].dt.strftime("%Y-%m-%d").values,
+                "Statut": np.array(STATUTS_PRESENCE)[facts["statut"].values],
+            })
+        return grid.pivot_table(index="Nom Étudiant", columns="Date", values="Statut", aggfunc="last")
+
+@st.cache_resource
+def get_attendance():
+    return AttendanceCube(get_backend())
+
+# ─── Lecture / Écriture ────────────────────────────────────────────────────────
 def read_sheet(sheet_name):
     try:
-        df = pd.read_excel(EXCEL_FILE, sheet_name=sheet_name)
-        return df
+        return get_store().get(sheet_name)
     except:
         return pd.DataFrame()
 
-def get_wb():
-    return openpyxl.load_workbook(EXCEL_FILE)
-
-def save_wb(wb):
-    wb.save(EXCEL_FILE)
+def query_sheet(sheet_name, filters=None, sort_by=None, ascending=True, offset=0, limit=None):
+    # (page, nombre total de lignes correspondant aux filtres)
+    return get_store().query(sheet_name, filters, sort_by, ascending, offset, limit)
 
 def next_id(df, col):
     if df.empty or col not in df.columns:
@@ -178,391 +1686,597 @@ def next_id(df, col):
     except:
         return 1
 
+def reserve_ids(sheet_name, n=1):
+    return get_backend().reserve_ids(sheet_name, n)
+
+def new_id(sheet_name):
+    return reserve_ids(sheet_name, 1)[0]
+
 def append_row(sheet_name, row_data):
-    wb = get_wb()
-    ws = wb[sheet_name]
-    ws.append(row_data)
-    # Style row
-    last_row = ws.max_row
-    border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                    top=Side(style='thin'), bottom=Side(style='thin'))
-    fill = PatternFill("solid", start_color="f8f9ff") if last_row % 2 == 0 else PatternFill("solid", start_color="FFFFFF")
-    for col in range(1, len(row_data) + 1):
-        cell = ws.cell(row=last_row, column=col)
-        cell.border = border
-        cell.fill = fill
-        cell.alignment = Alignment(vertical='center')
-    save_wb(wb)
+    get_backend().append(sheet_name, row_data)
+    get_store().invalidate([sheet_name])
 
 def update_row(sheet_name, id_col, id_val, updates: dict):
-    wb = get_wb()
-    ws = wb[sheet_name]
-    headers = [cell.value for cell in ws[1]]
-    id_idx = headers.index(id_col) + 1
-    for row in ws.iter_rows(min_row=2):
-        if row[id_idx-1].value == id_val:
-            for col_name, val in updates.items():
-                if col_name in headers:
-                    row[headers.index(col_name)].value = val
-            break
-    save_wb(wb)
+    update_rows(sheet_name, id_col, {id_val: updates})
+
+def update_rows(sheet_name, id_col, updates_by_id: dict):
+    # {id: {colonne: valeur}} appliqués en une seule écriture
+    get_backend().update_rows(sheet_name, id_col, updates_by_id)
+    get_store().invalidate([sheet_name])
 
 def delete_row(sheet_name, id_col, id_val):
-    wb = get_wb()
-    ws = wb[sheet_name]
-    headers = [cell.value for cell in ws[1]]
-    id_idx = headers.index(id_col) + 1
-    for row in ws.iter_rows(min_row=2):
-        if row[id_idx-1].value == id_val:
-            ws.delete_rows(row[0].row)
-            break
-    save_wb(wb)
-
-# ─── Génération PDF Groupe ──────────────────────────────────────────────────────
-def generate_pdf_groupe(groupe_nom, professeur, etudiants_df, paiements_df):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                            topMargin=1.5*cm, bottomMargin=1.5*cm,
-                            leftMargin=1.5*cm, rightMargin=1.5*cm)
-    styles = getSampleStyleSheet()
-    story = []
-
-    title_style = ParagraphStyle('title', fontSize=20, fontName='Helvetica-Bold',
-                                  textColor=colors.HexColor('#1a1a2e'), alignment=TA_CENTER, spaceAfter=6)
-    subtitle_style = ParagraphStyle('sub', fontSize=13, fontName='Helvetica',
-                                     textColor=colors.HexColor('#667eea'), alignment=TA_CENTER, spaceAfter=4)
-    info_style = ParagraphStyle('info', fontSize=10, fontName='Helvetica',
-                                 textColor=colors.HexColor('#555'), alignment=TA_CENTER, spaceAfter=12)
-    section_style = ParagraphStyle('section', fontSize=12, fontName='Helvetica-Bold',
-                                    textColor=colors.white, alignment=TA_LEFT)
-
-    # Header
-    story.append(Paragraph("🎓 FUTURO SKILLS ACADEMY", title_style))
-    story.append(Paragraph(f"Liste du Groupe : {groupe_nom}", subtitle_style))
-    story.append(Paragraph(f"Professeur : {professeur}  |  Date d'impression : {datetime.now().strftime('%d/%m/%Y %H:%M')}", info_style))
-    story.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#667eea'), spaceAfter=12))
-
-    # Stats
-    nb = len(etudiants_df)
-    payes = len(etudiants_df[etudiants_df.get("Statut Paiement", pd.Series([])) == "Payé"]) if not etudiants_df.empty and "Statut Paiement" in etudiants_df.columns else 0
-    
-    stats_data = [
-        ['📊 Statistiques du Groupe', '', ''],
-        [f'Total étudiants: {nb}', f'Payés: {payes}', f'En attente: {nb - payes}'],
-    ]
-    stats_table = Table(stats_data, colWidths=[6*cm, 5*cm, 5*cm])
-    stats_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1a1a2e')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 11),
-        ('SPAN', (0,0), (-1,0)),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('BACKGROUND', (0,1), (-1,-1), colors.HexColor('#f0f2ff')),
-        ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
-        ('FONTSIZE', (0,1), (-1,-1), 10),
-        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.HexColor('#f0f2ff')]),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#cccccc')),
-        ('TOPPADDING', (0,0), (-1,-1), 8),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-    ]))
-    story.append(stats_table)
-    story.append(Spacer(1, 15))
-
-    # Liste étudiants
-    story.append(Paragraph("📋 Liste des Étudiants", subtitle_style))
-    story.append(Spacer(1, 8))
-
-    if etudiants_df.empty:
-        story.append(Paragraph("Aucun étudiant dans ce groupe.", info_style))
+    delete_rows(sheet_name, id_col, [id_val])
+
+def delete_rows(sheet_name, id_col, ids):
+    get_backend().delete_rows(sheet_name, id_col, ids)
+    get_store().invalidate([sheet_name])
+
+def delete_where(sheet_name, match: dict):
+    get_backend().delete_where(sheet_name, match)
+    get_store().invalidate([sheet_name])
+
+def apply_ops(ops):
+    # Plusieurs opérations, éventuellement sur plusieurs feuilles, en une seule
+    # transaction (ex. [op_append("Étudiants", ...), op_append("Inscriptions", ...)])
+    get_backend().write(ops)
+    get_store().invalidate(sorted({op["sheet"] for op in ops}))
+
+def replace_rows(sheet_name, match: dict, rows):
+    # Remplace toutes les lignes correspondant à `match` par `rows` en une seule
+    # écriture ; la colonne ID de chaque ligne est attribuée en bloc.
+    new_ids = get_backend().replace_rows(sheet_name, match, rows)
+    get_store().invalidate([sheet_name])
+    return new_ids
+
+# ─── Export Excel (classeur stylé à la demande) ────────────────────────────────
+def export_excel():
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for sheet, cols in SCHEMA.items():
+        ws = wb.create_sheet(sheet)
+        _style_header(ws, cols)
+        _style_rows(ws, len(cols))
+        df = read_sheet(sheet)
+        if df.empty:
+            continue
+        df = df.reindex(columns=cols)
+        for rec in df.itertuples(index=False, name=None):
+            ws.append([_plain_value(v) for v in rec])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+def _excel_value(val):
+    # Comme _plain_value, mais les dates restent des dates : cellules datées
+    # dans le classeur exporté, comme le faisait DataFrame.to_excel
+    if isinstance(val, np.datetime64):
+        val = pd.Timestamp(val)
+    if isinstance(val, (datetime, date)):
+        if pd.isna(val):
+            return None
+        return val.to_pydatetime() if isinstance(val, pd.Timestamp) else val
+    return _plain_value(val)
+
+def stream_xlsx(df, title):
+    # Classeur openpyxl en mode write_only : chaque ligne est sérialisée dès
+    # qu'elle est ajoutée, aucune cellule n'est gardée en mémoire.
+    wb = openpyxl.Workbook(write_only=True)
+    _register_styles(wb)
+    ws = wb.create_sheet(title)
+    cols = [str(c) for c in df.columns]
+    header = []
+    for i, col in enumerate(cols, 1):
+        ws.column_dimensions[get_column_letter(i)].width = max(15, len(col) + 5)
+        cell = WriteOnlyCell(ws, value=col)
+        cell.style = HEADER_STYLE.name
+        header.append(cell)
+    ws.append(header)
+    for rec in df.itertuples(index=False, name=None):
+        ws.append([_excel_value(v) for v in rec])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+class ExportCache:
+    # Derniers exports générés, en mémoire ; au-delà de max_bytes les moins
+    # récemment utilisés sortent en premier. La clé contient la version des
+    # données : après une écriture, les anciens exports ne sont plus servis.
+
+    def __init__(self, max_bytes=EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            self._size += len(data) - (len(old) if old is not None else 0)
+            self._items[key] = data
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old)
+
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
+
+# ─── Paie des professeurs ─────────────────────────────────────────────────────
+DEFAULT_COMMISSION = 50  # % appliqué si le professeur n'a pas de taux enregistré
+PAYROLL_COLUMNS = ["Professeur", "Groupe", "Total Encaissé", "Taux Commission (%)", "Commission"]
+
+def compute_payroll(df_paie, df_groupes, df_profs, debut=None, fin=None):
+    # Une ligne par (professeur, groupe) : encaissements du groupe sur la période
+    # et commission au taux réel du professeur. Une seule agrégation + deux jointures.
+    paie = df_paie.reindex(columns=SCHEMA["Paiements"])
+    if debut is not None or fin is not None:
+        dates = pd.to_datetime(paie["Date Paiement"], errors="coerce")
+        keep = dates.notna()
+        if debut is not None:
+            keep &= dates >= pd.Timestamp(debut)
+        if fin is not None:
+            keep &= dates <= pd.Timestamp(fin)
+        paie = paie[keep]
+    encaisse = (pd.to_numeric(paie["Montant Payé"], errors="coerce")
+                .groupby(paie["Groupe"].astype(object)).sum().rename("Total Encaissé"))
+
+    groupes = df_groupes.reindex(columns=SCHEMA["Groupes"])[["Nom Groupe", "Professeur"]].astype(object)
+    profs = df_profs.reindex(columns=SCHEMA["Professeurs"])
+    taux = pd.DataFrame({
+        "Professeur": profs["Prénom"].fillna("").astype(str) + " " + profs["Nom"].fillna("").astype(str),
+        "Taux Commission (%)": pd.to_numeric(profs["Taux Commission (%)"], errors="coerce"),
+    }).drop_duplicates("Professeur")
+
+    lines = (groupes.rename(columns={"Nom Groupe": "Groupe"})
+             .merge(encaisse, left_on="Groupe", right_index=True, how="left")
+             .merge(taux, on="Professeur", how="left"))
+    lines["Total Encaissé"] = lines["Total Encaissé"].fillna(0)
+    lines["Taux Commission (%)"] = lines["Taux Commission (%)"].fillna(DEFAULT_COMMISSION)
+    lines["Commission"] = lines["Total Encaissé"] * lines["Taux Commission (%)"] / 100
+    return lines[PAYROLL_COLUMNS].reset_index(drop=True)
+
+def payroll_by_prof(lines, df_profs=None):
+    # Totaux par professeur ; avec df_profs, les professeurs sans groupe figurent à 0.
+    summary = (lines.groupby("Professeur", sort=False)
+               .agg(**{"Nb Groupes": ("Groupe", "count"),
+                       "Total Encaissé": ("Total Encaissé", "sum"),
+                       "Commission": ("Commission", "sum")}))
+    if df_profs is not None and not df_profs.empty:
+        noms = (df_profs["Prénom"].fillna("").astype(str) + " " + df_profs["Nom"].fillna("").astype(str))
+        summary = summary.reindex(pd.Index(noms.unique()).union(summary.index, sort=False), fill_value=0)
+    return summary.reset_index().rename(columns={"index": "Professeur"})
+
+def month_bounds(mois):
+    # "2026-10" -> (2026-10-01, 2026-10-31)
+    debut = pd.Period(mois, freq="M")
+    return debut.start_time.date(), debut.end_time.date()
+
+def export_payroll(lines, df_profs=None):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for title, df in (("Par professeur", payroll_by_prof(lines, df_profs)), ("Détail", lines)):
+        ws = wb.create_sheet(title)
+        _style_header(ws, list(df.columns))
+        _style_rows(ws, len(df.columns))
+        for rec in df.itertuples(index=False, name=None):
+            ws.append([_plain_value(v) for v in rec])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+# ─── Import en masse (CSV / XLSX) ──────────────────────────────────────────────
+# Champs obligatoires d'un nouvel étudiant : mêmes règles pour l'import et le
+# formulaire d'inscription (la modification d'une fiche existante n'exige rien)
+ETUDIANT_REQUIRED = ["Prénom", "Nom", "Email", "Téléphone", "Groupe"]
+IMPORT_OPTIONAL = ["Date Naissance", "Adresse", "Frais Total", "Statut Paiement"]
+STATUTS_PAIEMENT = ["Impayé", "Partiel", "Payé"]
+EMAIL_RE = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+PHONE_RE = r"^\+?[0-9][0-9 .\-]{7,18}$"
+
+def missing_fields(record):
+    # champs obligatoires absents ou vides (None, NaN, espaces), pour une fiche
+    return [c for c in ETUDIANT_REQUIRED
+            if c not in record or pd.isna(record[c]) or not str(record[c]).strip()]
+
+def read_import_file(source, filename=None):
+    # source : chemin ou fichier téléversé ; les en-têtes sont rapprochés du
+    # schéma sans tenir compte de la casse ni des accents ("prenom" -> "Prénom").
+    name = (filename or getattr(source, "name", None) or str(source)).lower()
+    if name.endswith((".xlsx", ".xlsm", ".xls")):
+        df = pd.read_excel(source, dtype=str)
     else:
-        headers = ['N°', 'Prénom', 'Nom', 'Téléphone', 'Email', 'Statut Paiement']
-        table_data = [headers]
-        for i, (_, row) in enumerate(etudiants_df.iterrows(), 1):
-            statut = row.get('Statut Paiement', 'N/A')
-            table_data.append([
-                str(i),
-                str(row.get('Prénom', '')),
-                str(row.get('Nom', '')),
-                str(row.get('Téléphone', '')),
-                str(row.get('Email', '')),
-                str(statut)
-            ])
-        
-        col_widths = [1*cm, 3.5*cm, 3.5*cm, 3*cm, 4.5*cm, 3*cm]
-        t = Table(table_data, colWidths=col_widths, repeatRows=1)
-        
-        style_cmds = [
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 10),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
-            ('FONTSIZE', (0,1), (-1,-1), 9),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#cccccc')),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-        ]
-        for i in range(1, len(table_data)):
-            bg = colors.HexColor('#f8f9ff') if i % 2 == 0 else colors.white
-            style_cmds.append(('BACKGROUND', (0,i), (-1,i), bg))
-            # Colorer statut
-            statut = table_data[i][5]
-            if statut == 'Payé':
-                style_cmds.append(('TEXTCOLOR', (5,i), (5,i), colors.HexColor('#276749')))
-                style_cmds.append(('FONTNAME', (5,i), (5,i), 'Helvetica-Bold'))
-            elif statut == 'Impayé':
-                style_cmds.append(('TEXTCOLOR', (5,i), (5,i), colors.HexColor('#c53030')))
-                style_cmds.append(('FONTNAME', (5,i), (5,i), 'Helvetica-Bold'))
-            else:
-                style_cmds.append(('TEXTCOLOR', (5,i), (5,i), colors.HexColor('#7b341e')))
-        
-        t.setStyle(TableStyle(style_cmds))
-        story.append(t)
-
-    # Paiement professeur
-    story.append(Spacer(1, 20))
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#cccccc'), spaceAfter=12))
-    story.append(Paragraph("💰 Rémunération du Professeur", subtitle_style))
-    story.append(Spacer(1, 8))
-
-    total_encaisse = 0
-    if not paiements_df.empty and 'Montant Payé' in paiements_df.columns:
-        groupe_paie = paiements_df[paiements_df['Groupe'] == groupe_nom] if 'Groupe' in paiements_df.columns else paiements_df
-        total_encaisse = groupe_paie['Montant Payé'].sum() if not groupe_paie.empty else 0
-
-    commission = total_encaisse * 0.50
-
-    pay_data = [
-        ['Description', 'Montant'],
-        ['Total encaissé du groupe', f'{total_encaisse:,.0f} MAD'],
-        ['Commission professeur (50%)', f'{commission:,.0f} MAD'],
-    ]
-    pay_table = Table(pay_data, colWidths=[10*cm, 6.5*cm])
-    pay_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1a1a2e')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 11),
-        ('BACKGROUND', (0,1), (-1,1), colors.HexColor('#f0f2ff')),
-        ('BACKGROUND', (0,2), (-1,2), colors.HexColor('#c6f6d5')),
-        ('FONTNAME', (0,2), (-1,2), 'Helvetica-Bold'),
-        ('TEXTCOLOR', (0,2), (-1,2), colors.HexColor('#276749')),
-        ('FONTSIZE', (0,1), (-1,-1), 11),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#cccccc')),
-        ('TOPPADDING', (0,0), (-1,-1), 10),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 10),
-    ]))
-    story.append(pay_table)
-
-    # Footer
-    story.append(Spacer(1, 20))
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#cccccc'), spaceAfter=8))
-    footer_style = ParagraphStyle('footer', fontSize=8, textColor=colors.HexColor('#999'), alignment=TA_CENTER)
-    story.append(Paragraph("Futuro Skills Academy — Document confidentiel — Imprimé le " + datetime.now().strftime('%d/%m/%Y'), footer_style))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-# ─── Génération PDF Feuille de Présence ───────────────────────────────────────
-def generate_pdf_presence(groupe_nom, professeur, date_seance, num_seance,
-                           horaire, salle, etudiants_df, presences_dict):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                            topMargin=1.2*cm, bottomMargin=1.5*cm,
-                            leftMargin=1.5*cm, rightMargin=1.5*cm)
-    story = []
-
-    title_style = ParagraphStyle('title', fontSize=18, fontName='Helvetica-Bold',
-                                  textColor=colors.HexColor('#1a1a2e'), alignment=TA_CENTER, spaceAfter=4)
-    subtitle_style = ParagraphStyle('sub', fontSize=11, fontName='Helvetica',
-                                     textColor=colors.HexColor('#667eea'), alignment=TA_CENTER, spaceAfter=3)
-    info_style = ParagraphStyle('info', fontSize=9, fontName='Helvetica',
-                                 textColor=colors.HexColor('#555'), alignment=TA_CENTER, spaceAfter=8)
-    label_style = ParagraphStyle('label', fontSize=9, fontName='Helvetica-Bold',
-                                  textColor=colors.HexColor('#1a1a2e'))
-
-    # ── Header ──
-    story.append(Paragraph("FUTURO SKILLS ACADEMY", title_style))
-    story.append(Paragraph("FEUILLE DE PRESENCE", subtitle_style))
-    story.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#667eea'), spaceAfter=8))
-
-    # ── Info bloc ──
-    date_str = date_seance.strftime('%A %d %B %Y').capitalize() if hasattr(date_seance, 'strftime') else str(date_seance)
-    info_data = [
-        [Paragraph('<b>Groupe :</b>', label_style), Paragraph(str(groupe_nom), label_style),
-         Paragraph('<b>Seance N° :</b>', label_style), Paragraph(str(num_seance), label_style)],
-        [Paragraph('<b>Professeur :</b>', label_style), Paragraph(str(professeur), label_style),
-         Paragraph('<b>Date :</b>', label_style), Paragraph(date_str, label_style)],
-        [Paragraph('<b>Horaire :</b>', label_style), Paragraph(str(horaire), label_style),
-         Paragraph('<b>Salle :</b>', label_style), Paragraph(str(salle), label_style)],
-    ]
-    info_table = Table(info_data, colWidths=[3.2*cm, 6*cm, 3.2*cm, 5.1*cm])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#f0f2ff')),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('TOPPADDING', (0,0), (-1,-1), 5),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 5),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#c5cae9')),
-        ('ROWBACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#f0f2ff'), colors.HexColor('#e8eaf6')]),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 10))
-
-    # ── Tableau présences ──
-    nb_et = len(etudiants_df)
-
-    # Build header row with legend
-    PRESENT_CHAR = "P"
-    ABSENT_CHAR  = "A"
-    RETARD_CHAR  = "R"
-    EXCUSE_CHAR  = "E"
-
-    headers = ['N°', 'Nom et Prénom', 'Statut', 'Signature']
-    table_data = [headers]
-
-    has_data = bool(presences_dict)
-
-    for i, (_, row) in enumerate(etudiants_df.iterrows(), 1):
-        et_id = row.get('ID', '')
-        nom_complet = f"{row.get('Prénom', '')} {row.get('Nom', '')}"
-        statut = presences_dict.get(str(et_id), '')
-
-        if statut == 'Présent':
-            statut_display = PRESENT_CHAR
-        elif statut == 'Absent':
-            statut_display = ABSENT_CHAR
-        elif statut == 'Retard':
-            statut_display = RETARD_CHAR
-        elif statut == 'Excusé':
-            statut_display = EXCUSE_CHAR
+        df = pd.read_csv(source, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    known = {_fold(c): c for c in ETUDIANT_REQUIRED + IMPORT_OPTIONAL}
+    df = df.rename(columns=lambda c: known.get(_fold(c), str(c).strip()))
+    return df.dropna(how="all").reset_index(drop=True)
+
+def validate_import(df, df_groupes, df_etudiants):
+    # Validation vectorisée : un masque booléen par règle, aucune boucle ligne à
+    # ligne. Renvoie (lignes valides normalisées, DataFrame des erreurs).
+    df = df.reindex(columns=ETUDIANT_REQUIRED + IMPORT_OPTIONAL)
+    df = df.apply(lambda col: col.fillna("").astype(str).str.strip())
+    email_key = df["Email"].str.lower()
+
+    groupes = (df_groupes.reindex(columns=SCHEMA["Groupes"])
+               .drop_duplicates("Nom Groupe").set_index("Nom Groupe"))
+    existing = set(df_etudiants["Email"].dropna().astype(str).str.strip().str.lower()) \
+        if not df_etudiants.empty and "Email" in df_etudiants.columns else set()
+
+    checks = {f"{col} manquant": df[col] == "" for col in ETUDIANT_REQUIRED}
+    checks["Email invalide"] = (df["Email"] != "") & ~df["Email"].str.match(EMAIL_RE)
+    checks["Téléphone invalide"] = (df["Téléphone"] != "") & ~df["Téléphone"].str.match(PHONE_RE)
+    checks["Groupe inconnu"] = (df["Groupe"] != "") & ~df["Groupe"].isin(groupes.index)
+    checks["Email en double dans le fichier"] = (email_key != "") & email_key.duplicated(keep=False)
+    checks["Email déjà inscrit"] = email_key.isin(existing)
+    checks["Statut Paiement invalide"] = (df["Statut Paiement"] != "") & ~df["Statut Paiement"].isin(STATUTS_PAIEMENT)
+    frais = pd.to_numeric(df["Frais Total"].str.replace(",", "."), errors="coerce")
+    checks["Frais Total invalide"] = (df["Frais Total"] != "") & frais.isna()
+
+    flags = pd.DataFrame(checks)
+    bad = flags.any(axis=1)
+    errors = pd.DataFrame({
+        "Ligne": flags.index[bad] + 2,  # +1 en-tête, +1 numérotation tableur
+        "Email": df.loc[bad, "Email"].values,
+        "Erreurs": flags[bad].dot(flags.columns + ", ").str.rstrip(", ").values,
+    })
+
+    valid = df[~bad].copy()
+    frais_grp = pd.to_numeric(valid["Groupe"].map(groupes["Frais"]), errors="coerce")
+    valid["Frais Total"] = frais[~bad].fillna(frais_grp).fillna(0)
+    if (valid["Frais Total"] % 1 == 0).all():
+        valid["Frais Total"] = valid["Frais Total"].astype(int)
+    valid["Statut Paiement"] = valid["Statut Paiement"].replace("", "Impayé")
+    valid["Professeur"] = valid["Groupe"].map(groupes["Professeur"]).fillna("")
+    return valid.reset_index(drop=True), errors
+
+def import_etudiants(df, df_groupes=None, df_etudiants=None):
+    # Étudiants + Inscriptions écrits dans une seule transaction, IDs réservés en bloc.
+    if df_groupes is None:
+        df_groupes = read_sheet("Groupes")
+    if df_etudiants is None:
+        df_etudiants = read_sheet("Étudiants")
+    valid, errors = validate_import(df, df_groupes, df_etudiants)
+    if valid.empty:
+        return 0, errors
+    n = len(valid)
+    today = str(date.today())
+    et_ids = reserve_ids("Étudiants", n)
+    insc_ids = reserve_ids("Inscriptions", n)
+    etudiants = pd.DataFrame({
+        "ID": et_ids, "Prénom": valid["Prénom"], "Nom": valid["Nom"], "Email": valid["Email"],
+        "Téléphone": valid["Téléphone"], "Date Naissance": valid["Date Naissance"],
+        "Adresse": valid["Adresse"], "Groupe": valid["Groupe"], "Date Inscription": today,
+        "Frais Total": valid["Frais Total"], "Statut Paiement": valid["Statut Paiement"],
+    }, columns=SCHEMA["Étudiants"])
+    inscriptions = pd.DataFrame({
+        "ID Inscription": insc_ids, "ID Étudiant": et_ids,
+        "Nom Complet": valid["Prénom"] + " " + valid["Nom"], "Groupe": valid["Groupe"],
+        "Professeur": valid["Professeur"], "Date Inscription": today,
+        "Frais": valid["Frais Total"], "Statut": valid["Statut Paiement"],
+    }, columns=SCHEMA["Inscriptions"])
+    apply_ops([op_append("Étudiants", etudiants.values.tolist()),
+               op_append("Inscriptions", inscriptions.values.tolist())])
+    return n, errors
+
+# ─── Cache des PDF (adressé par contenu) ──────────────────────────────────────
+def _hash_value(h, val):
+    if isinstance(val, pd.DataFrame):
+        h.update(json.dumps(list(map(str, val.columns))).encode())
+        h.update(pd.util.hash_pandas_object(val.astype(object), index=False).values.tobytes())
+    elif isinstance(val, pd.Series):
+        _hash_value(h, val.to_dict())
+    elif isinstance(val, (list, tuple)):  # livrets : séances imbriquées
+        h.update(b"[")
+        for item in val:
+            _hash_value(h, item)
+    else:
+        h.update(json.dumps(val, sort_keys=True, default=str).encode())
+    h.update(b"\0")
+
+def pdf_key(kind, args):
+    # empreinte des entrées exactes du générateur + version du gabarit
+    h = hashlib.sha256(f"{kind}|{TEMPLATE_VERSION}".encode())
+    for val in args:
+        _hash_value(h, val)
+    return h.hexdigest()
+
+class PdfCache:
+    # PDF rendus, stockés sur disque sous le nom de leur empreinte. Un accès
+    # rafraîchit la date du fichier ; au-delà de max_bytes on supprime les
+    # moins récemment utilisés (LRU). Un PDF en cache garde la date
+    # d'impression de son premier rendu.
+
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(e.stat().st_size for e in os.scandir(directory) if e.name.endswith(".pdf"))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith(".pdf")),
+                         key=lambda e: e.stat().st_mtime)
+        self._size = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:  # déjà supprimé par un autre processus
+                pass
+            self._size -= size
+
+@st.cache_resource
+def get_pdf_cache():
+    return PdfCache()
+
+def cached_pdf(kind, args):
+    # octets du PDF, rendu seulement si ces entrées n'ont jamais été imprimées
+    cache = get_pdf_cache()
+    key = pdf_key(kind, args)
+    data = cache.get(key)
+    if data is None:
+        data = render_job((key, kind, args))[1]
+        cache.put(key, data)
+    return data
+
+# ─── Rendu PDF en parallèle ────────────────────────────────────────────────────
+@st.cache_resource
+def get_pdf_pool():
+    # "spawn" : forker le serveur Streamlit (multi-thread) n'est pas sûr ;
+    # PdfContext évite que chaque processus ré-exécute ce script.
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=PdfContext())
+
+def render_pdfs(jobs):
+    # Sert d'abord les PDF déjà en cache, puis rend les autres sur tous les
+    # cœurs ; renvoie les (nom, octets) au fil de l'eau, dans l'ordre d'achèvement.
+    # Des jobs aux entrées identiques ne sont rendus qu'une fois mais chacun
+    # est renvoyé sous son nom ; deux jobs du même nom sont refusés.
+    names = Counter(name for name, _, _ in jobs)
+    doublons = [name for name, n in names.items() if n > 1]
+    if doublons:
+        raise ValueError(f"Noms de PDF en double : {', '.join(doublons)}")
+    cache = get_pdf_cache()
+    todo = {}  # empreinte -> (type, arguments, [noms])
+    for name, kind, args in jobs:
+        key = pdf_key(kind, args)
+        if key in todo:
+            todo[key][2].append(name)
+            continue
+        data = cache.get(key)
+        if data is not None:
+            yield name, data
         else:
-            statut_display = ''   # blank box for manual fill
-
-        table_data.append([str(i), nom_complet, statut_display, ''])
-
-    row_h = 1.1*cm
-    col_widths = [1.2*cm, 9*cm, 2.5*cm, 4.8*cm]
-    t = Table(table_data, colWidths=col_widths, rowHeights=[0.8*cm] + [row_h]*nb_et, repeatRows=1)
-
-    style_cmds = [
-        # Header
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1a1a2e')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        # Data
-        ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
-        ('FONTSIZE', (0,1), (-1,-1), 9),
-        ('ALIGN', (0,1), (0,-1), 'CENTER'),   # N°
-        ('ALIGN', (2,1), (2,-1), 'CENTER'),   # Statut
-        ('ALIGN', (3,1), (3,-1), 'CENTER'),   # Signature
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#9e9e9e')),
-        ('LEFTPADDING', (1,1), (1,-1), 6),
-    ]
-
-    # Alternate row colors + color statut cells
-    for i in range(1, len(table_data)):
-        bg = colors.HexColor('#fafafa') if i % 2 == 0 else colors.white
-        style_cmds.append(('BACKGROUND', (0,i), (-1,i), bg))
-        statut_val = table_data[i][2]
-        if statut_val == PRESENT_CHAR:
-            style_cmds.append(('BACKGROUND', (2,i), (2,i), colors.HexColor('#c6f6d5')))
-            style_cmds.append(('TEXTCOLOR', (2,i), (2,i), colors.HexColor('#276749')))
-            style_cmds.append(('FONTNAME', (2,i), (2,i), 'Helvetica-Bold'))
-        elif statut_val == ABSENT_CHAR:
-            style_cmds.append(('BACKGROUND', (2,i), (2,i), colors.HexColor('#fed7d7')))
-            style_cmds.append(('TEXTCOLOR', (2,i), (2,i), colors.HexColor('#c53030')))
-            style_cmds.append(('FONTNAME', (2,i), (2,i), 'Helvetica-Bold'))
-        elif statut_val == RETARD_CHAR:
-            style_cmds.append(('BACKGROUND', (2,i), (2,i), colors.HexColor('#feebc8')))
-            style_cmds.append(('TEXTCOLOR', (2,i), (2,i), colors.HexColor('#7b341e')))
-            style_cmds.append(('FONTNAME', (2,i), (2,i), 'Helvetica-Bold'))
-        elif statut_val == EXCUSE_CHAR:
-            style_cmds.append(('BACKGROUND', (2,i), (2,i), colors.HexColor('#e9d8fd')))
-            style_cmds.append(('TEXTCOLOR', (2,i), (2,i), colors.HexColor('#553c9a')))
-            style_cmds.append(('FONTNAME', (2,i), (2,i), 'Helvetica-Bold'))
-
-    t.setStyle(TableStyle(style_cmds))
-    story.append(t)
-    story.append(Spacer(1, 10))
-
-    # ── Légende ──
-    legend_style = ParagraphStyle('leg', fontSize=8, fontName='Helvetica', textColor=colors.HexColor('#555'))
-    story.append(Paragraph(
-        "<b>Légende :</b>  P = Présent   |   A = Absent   |   R = Retard   |   E = Excusé",
-        legend_style))
-    story.append(Spacer(1, 14))
-
-    # ── Stats si données ──
-    if has_data and nb_et > 0:
-        vals = list(presences_dict.values())
-        nb_p = vals.count('Présent')
-        nb_a = vals.count('Absent')
-        nb_r = vals.count('Retard')
-        nb_e = vals.count('Excusé')
-        taux = round(nb_p / nb_et * 100) if nb_et else 0
-
-        stat_data = [
-            ['Présents', 'Absents', 'Retards', 'Excusés', 'Taux de présence'],
-            [str(nb_p), str(nb_a), str(nb_r), str(nb_e), f'{taux} %'],
-        ]
-        st_table = Table(stat_data, colWidths=[3.5*cm]*5)
-        st_table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 9),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTNAME', (0,1), (-1,1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,1), (-1,1), 12),
-            ('BACKGROUND', (0,1), (0,1), colors.HexColor('#c6f6d5')),
-            ('BACKGROUND', (1,1), (1,1), colors.HexColor('#fed7d7')),
-            ('BACKGROUND', (2,1), (2,1), colors.HexColor('#feebc8')),
-            ('BACKGROUND', (3,1), (3,1), colors.HexColor('#e9d8fd')),
-            ('BACKGROUND', (4,1), (4,1), colors.HexColor('#bee3f8')),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#cccccc')),
-            ('TOPPADDING', (0,0), (-1,-1), 7),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 7),
-        ]))
-        story.append(st_table)
-        story.append(Spacer(1, 14))
-
-    # ── Signatures ──
-    sig_data = [
-        ['Signature du Professeur', 'Visa Direction / Administration'],
-        ['\n\n\n\n', '\n\n\n\n'],
-    ]
-    sig_table = Table(sig_data, colWidths=[8.75*cm, 8.75*cm])
-    sig_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#e8eaf6')),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 9),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#9e9e9e')),
-        ('TOPPADDING', (0,0), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-    ]))
-    story.append(sig_table)
-
-    # ── Footer ──
-    story.append(Spacer(1, 10))
-    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#cccccc'), spaceAfter=4))
-    footer_style = ParagraphStyle('footer', fontSize=7, textColor=colors.HexColor('#999'), alignment=TA_CENTER)
-    story.append(Paragraph(
-        f"Futuro Skills Academy — Feuille de présence confidentielle — Imprimée le {datetime.now().strftime('%d/%m/%Y à %H:%M')}",
-        footer_style))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+            todo[key] = (kind, args, [name])
 
+    def done(key, data):
+        cache.put(key, data)
+        return [(name, data) for name in todo[key][2]]
+
+    if len(todo) < 2 or (os.cpu_count() or 1) < 2:
+        for key, (kind, args, _) in todo.items():
+            yield from done(key, render_job((key, kind, args))[1])
+        return
+    try:
+        futures = [get_pdf_pool().submit(render_job, (key, kind, args))
+                   for key, (kind, args, _) in todo.items()]
+    except BrokenProcessPool:
+        get_pdf_pool.clear()
+        futures = [get_pdf_pool().submit(render_job, (key, kind, args))
+                   for key, (kind, args, _) in todo.items()]
+    for fut in as_completed(futures):
+        yield from done(*fut.result())
+
+def group_pdf_jobs(df_groupes, df_etudiants, paie_par_groupe):
+    # Étudiants découpés par groupe en une passe ; un job par groupe. L'ID du
+    # groupe dans le nom de fichier : deux groupes homonymes gardent chacun leur PDF.
+    parts = dict(tuple(df_etudiants.groupby('Groupe', sort=False))) if 'Groupe' in df_etudiants.columns else {}
+    empty = df_etudiants.iloc[0:0]
+    groupes = df_groupes.reindex(columns=['ID Groupe', 'Nom Groupe', 'Professeur'])
+    return [(f"groupe_{g_nom.replace(' ','_')}_{_id_key(g_id)}.pdf", "groupe",
+             (g_nom, g_prof, parts.get(g_nom, empty), paie_par_groupe.loc[g_nom].to_dict()))
+            for g_id, g_nom, g_prof in groupes.itertuples(index=False)]
+
+def _unique_name(stem, taken):
+    # "stem.pdf", ou "stem_2.pdf", "stem_3.pdf"… si le nom est déjà pris
+    name, n = f"{stem}.pdf", 1
+    while name in taken:
+        n += 1
+        name = f"{stem}_{n}.pdf"
+    taken.add(name)
+    return name
+
+JOURS_SEMAINE = ["lun", "mar", "mer", "jeu", "ven", "sam", "dim"]
+JOUR_RE = re.compile(r"\b(" + "|".join(JOURS_SEMAINE) + r")")
+
+def groupes_du_jour(df_groupes, jour):
+    # Groupes en cours à cette date (entre Date Début et Date Fin) dont
+    # l'horaire cite le jour de la semaine : "Lun-Mer 18h-20h" -> lundi et
+    # mercredi. Un horaire sans jour reconnu est gardé, faute de mieux.
+    if df_groupes.empty:
+        return df_groupes
+    cols = df_groupes.reindex(columns=['Date Début', 'Date Fin', 'Horaire'])
+    jour = pd.Timestamp(jour)
+    debut = pd.to_datetime(cols['Date Début'], errors='coerce')
+    fin = pd.to_datetime(cols['Date Fin'], errors='coerce')
+    actif = (debut.isna() | (debut <= jour)) & (fin.isna() | (fin >= jour))
+    jours = cols['Horaire'].fillna('').map(lambda h: set(JOUR_RE.findall(_fold(h))))
+    ce_jour = jours.map(lambda js: not js or JOURS_SEMAINE[jour.weekday()] in js)
+    return df_groupes[actif & ce_jour]
+
+def livret_presence_jobs(df_groupes, df_etudiants, df_presences, jour, groupes,
+                         par=None, prerempli=False):
+    # Un livret (feuilles de tous les groupes du jour) ou un par valeur de
+    # `par` ("Salle" ou "Professeur"). Étudiants et présences découpés par
+    # groupe en une passe ; les groupes sans étudiant sont ignorés.
+    parts = dict(tuple(df_etudiants.groupby('Groupe', sort=False))) if 'Groupe' in df_etudiants.columns else {}
+    pr = df_presences.reindex(columns=['Groupe', 'Date Séance', 'ID Étudiant', 'Statut'])
+    pr = pr.assign(**{'Date Séance': pr['Date Séance'].astype(str)})
+    dates = pr.groupby('Groupe')['Date Séance'].unique().to_dict()
+    du_jour = pr[pr['Date Séance'] == str(jour)]
+    statuts = {g: dict(zip(d['ID Étudiant'].astype(str), d['Statut']))
+               for g, d in du_jour.groupby('Groupe', sort=False)} if prerempli else {}
+
+    livrets = {}
+    infos = df_groupes[df_groupes['Nom Groupe'].isin(groupes)].reindex(
+        columns=['Nom Groupe', 'Professeur', 'Horaire', 'Salle'])
+    for g_nom, prof, horaire, salle in infos.itertuples(index=False):
+        etudiants = parts.get(g_nom)
+        if etudiants is None or etudiants.empty:
+            continue
+        # n° de séance : rang de la date parmi les séances déjà saisies du groupe
+        faites = sorted(d for d in dates.get(g_nom, ()) if d < str(jour))
+        seance = (g_nom, prof, len(faites) + 1, horaire, salle,
+                  etudiants, statuts.get(g_nom, {}))
+        cle = _txt(salle if par == "Salle" else prof) if par else ""
+        livrets.setdefault(cle, []).append(seance)
+
+    # "S 1" et "S_1" donneraient le même nom de fichier
+    taken = set()
+    return [(_unique_name(f"presences_{jour}{'_' + cle.replace(' ', '_') if cle else ''}", taken),
+             "livret_presence", (jour, seances))
+            for cle, seances in livrets.items()]
+
+# ─── Archives ZIP (écrites en flux) ───────────────────────────────────────────
+class ZipSpool:
+    # Archive ZIP écrite au fil de l'eau dans un fichier temporaire "spoolé" :
+    # en mémoire jusqu'à max_memory octets, sur disque au-delà. Chaque document
+    # est ajouté puis oublié, la mémoire ne dépend plus du nombre de groupes.
+    # Les PDF sont déjà compressés : on les range sans les recompresser.
+
+    def __init__(self, max_memory=ARCHIVE_SPOOL_BYTES):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._zip = zipfile.ZipFile(self.file, "w", zipfile.ZIP_STORED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, name, data):
+        self._zip.writestr(name, data)
+
+    def close(self):
+        # referme l'archive et rembobine le fichier, prêt à être lu
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self.file.seek(0)
+        return self.file
+
+    def save(self, filename, directory=ARCHIVE_DIR):
+        # copie l'archive terminée dans directory pour un téléchargement ultérieur
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, filename)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(self.close(), f)
+        os.replace(tmp, path)
+        self.file.seek(0)
+        return path
+
+def stored_archives(directory=ARCHIVE_DIR):
+    # archives conservées, de la plus récente à la plus ancienne
+    try:
+        entries = [e for e in os.scandir(directory) if e.name.endswith(".zip")]
+    except FileNotFoundError:
+        return []
+    return sorted(entries, key=lambda e: e.stat().st_mtime, reverse=True)
+
+# ─── Tableaux paginés ──────────────────────────────────────────────────────────
+PAGE_SIZES = [25, 50, 100, 250]
+
+def paged_table(key, sheet_name, filters=None, frame=None, style=None, height=400):
+    # Affiche une page de la feuille (ou de `frame`, ex. résultats de recherche) :
+    # tri, filtres et découpage sont faits côté données, et seul le morceau
+    # visible est stylé et envoyé au navigateur. style : (colonne, valeur -> css).
+    cols = list(frame.columns) if frame is not None else SCHEMA[sheet_name]
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    with c1:
+        sort_by = st.selectbox("Trier par", ["—"] + cols, key=f"{key}_sort")
+    with c2:
+        ascending = st.selectbox("Ordre", ["Croissant", "Décroissant"], key=f"{key}_order") == "Croissant"
+    with c3:
+        size = st.selectbox("Lignes / page", PAGE_SIZES, key=f"{key}_size")
+    with c4:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    def fetch(page):
+        args = (filters, None if sort_by == "—" else sort_by, ascending, (page - 1) * size, size)
+        return query_frame(frame, *args) if frame is not None else query_sheet(sheet_name, *args)
+
+    rows, total = fetch(page)
+    n_pages = max(1, -(-total // size))
+    if page > n_pages:
+        page = n_pages
+        rows, total = fetch(page)
+    st.caption(f"Page {page} / {n_pages} — {total} ligne(s)")
+    if style is not None and style[0] in rows.columns:
+        st.dataframe(rows.style.map(style[1], subset=[style[0]]),
+                     use_container_width=True, height=height, hide_index=True)
+    else:
+        st.dataframe(rows, use_container_width=True, height=height, hide_index=True)
+    return total
+
+def cached_download(key, label, file_name, params, build, mime="application/vnd.ms-excel"):
+    # Fichier construit par build() seulement au clic, puis gardé en cache pour
+    # (params, version des données) : les autres interactions de la page ne
+    # sérialisent plus rien.
+    cache = get_export_cache()
+    cache_key = (key, params, get_backend().signature())
+    data = cache.get(cache_key)
+    if data is None and st.button(f"📤 {label}", key=f"{key}_export"):
+        with st.spinner("Préparation de l'export..."):
+            data = build()
+        cache.put(cache_key, data)
+    if data is not None:
+        st.download_button(f"⬇️ Télécharger {file_name}", data, file_name=file_name,
+                           mime=mime, key=f"{key}_download")
+
+def export_button(key, label, file_name, sheet_name, filters=None, search=None):
+    # Export Excel d'un tableau (feuille, filtres, recherche), écrit en flux
+    def build():
+        rows = query_sheet(sheet_name, filters)[0]
+        if search:
+            rows = search_frame(rows, sheet_name, search)
+        return stream_xlsx(rows, sheet_name)
+
+    params = (sheet_name, json.dumps(filters or {}, sort_keys=True, default=str), search or "")
+    cached_download(key, label, file_name, params, build)
 
 # ─── PAGE : PRÉSENCES ─────────────────────────────────────────────────────────
 def page_presences():
@@ -579,7 +2293,8 @@ def page_presences():
         st.warning("⚠️ Aucun groupe créé. Créez d'abord des groupes.")
         return
 
-    tab1, tab2, tab3 = st.tabs(["✅ Saisir une Séance", "📊 Historique", "🖨️ Imprimer PDF"])
+    tab1, tab2, tab3, tab4 = st.tabs(["✅ Saisir une Séance", "📊 Historique", "🖨️ Imprimer PDF",
+                                      "🚨 Étudiants à risque"])
 
     # ── TAB 1 : SAISIE ──────────────────────────────────────────────────────────
     with tab1:
@@ -624,134 +2339,125 @@ def page_presences():
             st.warning("Aucun étudiant inscrit dans ce groupe.")
         else:
             st.markdown(f"**{len(etudiants_grp)} étudiant(s) — Marquez les présences :**")
-            st.markdown("---")
-
-            # Check if already saved for this date+group
-            already_saved = False
-            if not df_presences.empty and 'Groupe' in df_presences.columns and 'Date Séance' in df_presences.columns:
-                existing = df_presences[
-                    (df_presences['Groupe'] == groupe_sel) &
-                    (df_presences['Date Séance'].astype(str) == str(date_seance))
-                ]
-                already_saved = not existing.empty
-
-            if already_saved:
-                st.success("✅ La présence de cette séance a déjà été enregistrée. Vous pouvez la consulter dans l'onglet Historique.")
-
-            # Build presence form
-            presences_saisies = {}
-            comments_saisies = {}
 
             STATUTS = ["Présent", "Absent", "Retard", "Excusé"]
             ICONS   = {"Présent": "🟢", "Absent": "🔴", "Retard": "🟡", "Excusé": "🟣"}
 
-            # Pre-fill if already saved
-            prefill = {}
-            if already_saved and not existing.empty and 'ID Étudiant' in existing.columns:
-                for _, pr in existing.iterrows():
-                    prefill[str(pr.get('ID Étudiant', ''))] = pr.get('Statut', 'Présent')
-
-            header_cols = st.columns([0.5, 3, 2, 3])
-            header_cols[0].markdown("**N°**")
-            header_cols[1].markdown("**Nom & Prénom**")
-            header_cols[2].markdown("**Statut**")
-            header_cols[3].markdown("**Commentaire**")
-            st.markdown("<hr style='margin:4px 0'>", unsafe_allow_html=True)
-
-            for i, (_, row) in enumerate(etudiants_grp.iterrows(), 1):
-                et_id  = str(row.get('ID', i))
-                nom    = f"{row.get('Prénom', '')} {row.get('Nom', '')}"
-                default_statut = prefill.get(et_id, "Présent")
-                def_idx = STATUTS.index(default_statut) if default_statut in STATUTS else 0
-
-                c0, c1, c2, c3 = st.columns([0.5, 3, 2, 3])
-                with c0:
-                    st.markdown(f"<div style='padding-top:8px;font-weight:600'>{i}</div>",
-                                unsafe_allow_html=True)
-                with c1:
-                    st.markdown(f"<div style='padding-top:8px'>{nom}</div>",
-                                unsafe_allow_html=True)
-                with c2:
-                    statut = st.selectbox(
-                        " ", STATUTS,
-                        index=def_idx,
-                        key=f"pres_{et_id}_{date_seance}_{groupe_sel}",
-                        label_visibility="collapsed",
-                        format_func=lambda s: f"{ICONS.get(s, '')} {s}"
-                    )
-                    presences_saisies[et_id] = statut
-                with c3:
-                    comment = st.text_input(
-                        " ", value="",
-                        key=f"comm_{et_id}_{date_seance}_{groupe_sel}",
-                        placeholder="Optionnel...",
-                        label_visibility="collapsed"
-                    )
-                    comments_saisies[et_id] = comment
+            pr_groupe = query_frame(df_presences, {"Groupe": groupe_sel})[0] \
+                if 'Groupe' in df_presences.columns else pd.DataFrame(columns=SCHEMA["Présences"])
+            dates_pr = pr_groupe['Date Séance'].astype(str)
+            existing = pr_groupe[dates_pr == str(date_seance)]
+            already_saved = not existing.empty
+            anciennes = dates_pr[dates_pr < str(date_seance)]
+            precedente = pr_groupe[dates_pr == anciennes.max()] if not anciennes.empty else None
 
-            st.markdown("---")
+            if already_saved:
+                st.success("✅ La présence de cette séance a déjà été enregistrée. Vous pouvez la consulter dans l'onglet Historique.")
 
-            # Stats live
-            nb_p = list(presences_saisies.values()).count("Présent")
-            nb_a = list(presences_saisies.values()).count("Absent")
-            nb_r = list(presences_saisies.values()).count("Retard")
-            nb_e = list(presences_saisies.values()).count("Excusé")
-            taux = round(nb_p / len(etudiants_grp) * 100) if len(etudiants_grp) > 0 else 0
+            def seance_grid(source, defaut="Présent"):
+                # une ligne par étudiant du groupe, statut/commentaire repris de `source`
+                grid = pd.DataFrame({
+                    "N°": range(1, len(etudiants_grp) + 1),
+                    "ID": etudiants_grp['ID'].values,
+                    "Nom & Prénom": (etudiants_grp['Prénom'].astype(str) + " " + etudiants_grp['Nom'].astype(str)).values,
+                })
+                keys = _id_keys(grid["ID"])
+                if source is not None and not source.empty:
+                    src = source.assign(_k=_id_keys(source['ID Étudiant'])).drop_duplicates("_k").set_index("_k")
+                    grid["Statut"] = keys.map(src['Statut']).where(lambda s: s.isin(STATUTS), defaut)
+                    grid["Commentaire"] = keys.map(src['Commentaire']).fillna("").astype(str)
+                else:
+                    grid["Statut"] = defaut
+                    grid["Commentaire"] = ""
+                return grid
+
+            # Grille pré-remplie avec la séance enregistrée ; les actions groupées
+            # la remplacent (nouvelle clé d'éditeur pour repartir de cette base).
+            # `manuels_key` : étudiants dont le statut a été choisi à la main,
+            # que « Tout marquer présent » ne touche pas.
+            grid_key = f"pres_grid_{groupe_sel}_{date_seance}"
+            version_key = f"{grid_key}_v"
+            manuels_key = f"{grid_key}_manuels"
+            editor_key = f"{grid_key}_editor_{st.session_state.get(version_key, 0)}"
+            if st.button("📋 Copier la séance précédente", disabled=precedente is None):
+                st.session_state[grid_key] = seance_grid(precedente)
+                st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+                st.session_state.pop(manuels_key, None)
+                st.rerun()
+            base = st.session_state.get(grid_key)
+            if base is None:
+                base = seance_grid(existing)
+
+            with st.form(f"form_{grid_key}"):
+                grille = st.data_editor(
+                    base,
+                    key=editor_key,
+                    hide_index=True, use_container_width=True,
+                    height=min(38 + 35 * len(base), 1450),
+                    column_order=["N°", "Nom & Prénom", "Statut", "Commentaire"],
+                    disabled=["N°", "Nom & Prénom"],
+                    column_config={
+                        "Statut": st.column_config.SelectboxColumn(
+                            "Statut", options=STATUTS, required=True, width="small"),
+                        "Commentaire": st.column_config.TextColumn("Commentaire", width="large"),
+                    })
+                b1, b2, b3 = st.columns(3)
+                with b1:
+                    save = st.form_submit_button("💾 Enregistrer les Présences",
+                                                 use_container_width=True, type="primary")
+                with b2:
+                    make_pdf = st.form_submit_button("🖨️ Générer PDF Séance", use_container_width=True)
+                with b3:
+                    # bouton du formulaire : les saisies en cours arrivent avec le clic
+                    tous = st.form_submit_button("✅ Tout marquer présent", use_container_width=True)
+
+            if tous:
+                edits = st.session_state.get(editor_key, {}).get("edited_rows", {})
+                manuels = st.session_state.setdefault(manuels_key, set())
+                manuels.update(_id_key(grille["ID"].iloc[int(i)])
+                               for i, chg in edits.items() if "Statut" in chg)
+                garde = _id_keys(grille["ID"]).isin(manuels).to_numpy()
+                st.session_state[grid_key] = grille.assign(
+                    Statut=np.where(garde, grille["Statut"], "Présent"))
+                st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+                st.rerun()
+
+            presences_saisies = dict(zip(_id_keys(grille["ID"]), grille["Statut"]))
+
+            # Stats de la grille
+            counts = grille["Statut"].value_counts()
+            nb_p = int(counts.get("Présent", 0))
+            taux = round(nb_p / len(grille) * 100) if len(grille) > 0 else 0
 
             m1, m2, m3, m4, m5 = st.columns(5)
-            m1.metric("🟢 Présents", nb_p)
-            m2.metric("🔴 Absents", nb_a)
-            m3.metric("🟡 Retards", nb_r)
-            m4.metric("🟣 Excusés", nb_e)
+            m1.metric(f"{ICONS['Présent']} Présents", nb_p)
+            m2.metric(f"{ICONS['Absent']} Absents", int(counts.get("Absent", 0)))
+            m3.metric(f"{ICONS['Retard']} Retards", int(counts.get("Retard", 0)))
+            m4.metric(f"{ICONS['Excusé']} Excusés", int(counts.get("Excusé", 0)))
             m5.metric("📊 Taux", f"{taux}%")
 
-            st.markdown("---")
-            btn_save, btn_pdf = st.columns(2)
-
-            with btn_save:
-                if st.button("💾 Enregistrer les Présences", use_container_width=True, type="primary"):
-                    # Delete existing records for this date+group first (overwrite)
-                    wb = get_wb()
-                    ws_pr = wb["Présences"]
-                    rows_to_delete = []
-                    headers_pr = [c.value for c in ws_pr[1]]
-                    if 'Groupe' in headers_pr and 'Date Séance' in headers_pr:
-                        gi = headers_pr.index('Groupe') + 1
-                        di = headers_pr.index('Date Séance') + 1
-                        for r in ws_pr.iter_rows(min_row=2):
-                            if str(r[gi-1].value) == groupe_sel and str(r[di-1].value) == str(date_seance):
-                                rows_to_delete.append(r[0].row)
-                    for rn in sorted(rows_to_delete, reverse=True):
-                        ws_pr.delete_rows(rn)
-                    save_wb(wb)
-
-                    # Append new records
-                    df_pr_cur = read_sheet("Présences")
-                    for et_id, statut in presences_saisies.items():
-                        et_row = etudiants_grp[etudiants_grp['ID'].astype(str) == et_id]
-                        nom_et = f"{et_row.iloc[0]['Prénom']} {et_row.iloc[0]['Nom']}" if not et_row.empty else et_id
-                        new_id = next_id(df_pr_cur, "ID")
-                        append_row("Présences", [
-                            new_id, groupe_sel, professeur,
-                            str(date_seance), int(num_seance),
-                            int(et_id) if et_id.isdigit() else et_id,
-                            nom_et, statut, comments_saisies.get(et_id, '')
-                        ])
-                        df_pr_cur = read_sheet("Présences")  # refresh id counter
-                    st.success(f"✅ Présences du {date_seance.strftime('%d/%m/%Y')} enregistrées pour '{groupe_sel}' !")
-                    st.rerun()
-
-            with btn_pdf:
-                if st.button("🖨️ Générer PDF Séance", use_container_width=True):
-                    pdf_buf = generate_pdf_presence(
-                        groupe_sel, professeur, date_seance, num_seance,
-                        horaire, salle, etudiants_grp, presences_saisies)
-                    st.download_button(
-                        "⬇️ Télécharger la Feuille de Présence",
-                        pdf_buf,
-                        file_name=f"presence_{groupe_sel.replace(' ','_')}_{date_seance}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True)
+            if save:
+                # Remplace la séance (groupe + date) en une seule écriture
+                rows = [[None, groupe_sel, professeur, str(date_seance), int(num_seance),
+                         et_id, nom, statut, comment]
+                        for et_id, nom, statut, comment in grille[
+                            ["ID", "Nom & Prénom", "Statut", "Commentaire"]].itertuples(index=False, name=None)]
+                replace_rows("Présences", {"Groupe": groupe_sel, "Date Séance": str(date_seance)}, rows)
+                st.session_state.pop(grid_key, None)
+                st.session_state.pop(manuels_key, None)
+                st.success(f"✅ Présences du {date_seance.strftime('%d/%m/%Y')} enregistrées pour '{groupe_sel}' !")
+                st.rerun()
+
+            if make_pdf:
+                pdf_buf = cached_pdf("presence", (
+                    groupe_sel, professeur, date_seance, num_seance,
+                    horaire, salle, etudiants_grp, presences_saisies))
+                st.download_button(
+                    "⬇️ Télécharger la Feuille de Présence",
+                    pdf_buf,
+                    file_name=f"presence_{groupe_sel.replace(' ','_')}_{date_seance}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True)
 
     # ── TAB 2 : HISTORIQUE ───────────────────────────────────────────────────────
     with tab2:
@@ -770,48 +2476,37 @@ def page_presences():
                 filtre_statut = st.selectbox("Filtrer par statut",
                                              ["Tous", "Présent", "Absent", "Retard", "Excusé"], key="hist_s")
 
-            filtered = df_pr.copy()
+            filters = {}
             if filtre_g != "Tous":
-                filtered = filtered[filtered['Groupe'] == filtre_g]
-            if filtre_statut != "Tous" and 'Statut' in filtered.columns:
-                filtered = filtered[filtered['Statut'] == filtre_statut]
-
-            st.markdown(f"**{len(filtered)} enregistrement(s)**")
-
-            if 'Statut' in filtered.columns:
-                def color_pr(val):
-                    if val == 'Présent': return 'background-color:#c6f6d5;color:#276749'
-                    elif val == 'Absent': return 'background-color:#fed7d7;color:#9b2c2c'
-                    elif val == 'Retard': return 'background-color:#feebc8;color:#7b341e'
-                    elif val == 'Excusé': return 'background-color:#e9d8fd;color:#553c9a'
-                    return ''
-                st.dataframe(filtered.style.applymap(color_pr, subset=['Statut']),
-                             use_container_width=True, height=400)
-            else:
-                st.dataframe(filtered, use_container_width=True, height=400)
-
-            # Taux de présence par groupe
-            if not df_pr.empty and 'Groupe' in df_pr.columns and 'Statut' in df_pr.columns:
-                st.markdown("---")
-                st.markdown('<div class="section-header">📈 Taux de Présence par Groupe</div>',
-                            unsafe_allow_html=True)
-                taux_data = {}
-                for g in df_pr['Groupe'].dropna().unique():
-                    g_df = df_pr[df_pr['Groupe'] == g]
-                    total = len(g_df)
-                    presnt = len(g_df[g_df['Statut'] == 'Présent'])
-                    taux_data[g] = round(presnt / total * 100, 1) if total > 0 else 0
-                taux_series = pd.Series(taux_data, name="Taux de présence (%)")
-                st.bar_chart(taux_series)
+                filters['Groupe'] = filtre_g
+            if filtre_statut != "Tous":
+                filters['Statut'] = filtre_statut
+
+            count_slot = st.empty()
+
+            def color_pr(val):
+                if val == 'Présent': return 'background-color:#c6f6d5;color:#276749'
+                elif val == 'Absent': return 'background-color:#fed7d7;color:#9b2c2c'
+                elif val == 'Retard': return 'background-color:#feebc8;color:#7b341e'
+                elif val == 'Excusé': return 'background-color:#e9d8fd;color:#553c9a'
+                return ''
+            total = paged_table("presences", "Présences", filters, style=('Statut', color_pr))
+            count_slot.markdown(f"**{total} enregistrement(s)**")
+
+            # Taux de présence (cube des présences, recalculé une fois par version des données)
+            st.markdown("---")
+            st.markdown('<div class="section-header">📈 Taux de Présence</div>',
+                        unsafe_allow_html=True)
+            axe = st.radio("Par", ["Groupe", "Professeur", "Étudiant", "Semaine", "Mois"],
+                           horizontal=True, key="hist_axe")
+            taux = get_attendance().rates(axe)
+            if axe in ("Groupe", "Professeur", "Semaine", "Mois"):
+                st.bar_chart(taux["Taux (%)"].rename("Taux de présence (%)"))
+            st.dataframe(taux, use_container_width=True, height=300)
 
             # Export
-            buf = io.BytesIO()
-            with pd.ExcelWriter(buf, engine='openpyxl') as w:
-                filtered.to_excel(w, index=False)
-            buf.seek(0)
-            st.download_button("⬇️ Exporter Historique (Excel)", buf,
-                               file_name="presences_futuro.xlsx",
-                               mime="application/vnd.ms-excel")
+            export_button("presences", "Exporter Historique (Excel)", "presences_futuro.xlsx",
+                          "Présences", filters)
 
     # ── TAB 3 : IMPRESSION PDF ───────────────────────────────────────────────────
     with tab3:
@@ -869,9 +2564,9 @@ def page_presences():
                 st.error("Aucun étudiant dans ce groupe.")
             else:
                 with st.spinner("Génération du PDF..."):
-                    pdf_buf = generate_pdf_presence(
+                    pdf_buf = cached_pdf("presence", (
                         grp_pdf, prof_pdf, date_pdf, num_pdf,
-                        hor_pdf, salle_pdf, et_grp_pdf, presences_pdf)
+                        hor_pdf, salle_pdf, et_grp_pdf, presences_pdf))
                 st.success("✅ PDF généré !")
                 st.download_button(
                     "⬇️ Télécharger la Feuille de Présence",
@@ -880,6 +2575,68 @@ def page_presences():
                     mime="application/pdf",
                     use_container_width=True)
 
+        st.markdown("---")
+        st.markdown('<div class="section-header">📚 Livret du jour (tous les groupes)</div>',
+                    unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            jour_livret = st.date_input("Date", value=date.today(), key="livret_date")
+        with col2:
+            decoupage = st.radio("Découpage", ["Un seul PDF", "Un PDF par salle", "Un PDF par professeur"],
+                                 key="livret_split")
+        with col3:
+            prerempli = st.checkbox("Pré-remplir depuis l'historique", key="livret_prefill")
+
+        # la sélection par défaut suit la date choisie
+        du_jour = groupes_du_jour(df_groupes, jour_livret)['Nom Groupe'].tolist()
+        groupes_livret = st.multiselect("Groupes ayant cours ce jour-là",
+                                        df_groupes['Nom Groupe'].tolist(), default=du_jour,
+                                        key=f"livret_grp_{jour_livret}")
+
+        if st.button("📚 Générer le livret", use_container_width=True):
+            par = {"Un PDF par salle": "Salle", "Un PDF par professeur": "Professeur"}.get(decoupage)
+            jobs = livret_presence_jobs(df_groupes, df_etudiants, df_presences, jour_livret,
+                                        groupes_livret, par=par, prerempli=prerempli)
+            if not jobs:
+                st.error("Aucun étudiant dans les groupes sélectionnés.")
+            elif len(jobs) == 1:
+                with st.spinner("Génération du livret..."):
+                    name, kind, args = jobs[0]
+                    pdf = cached_pdf(kind, args)
+                st.download_button("⬇️ Télécharger le livret", pdf, file_name=name,
+                                   mime="application/pdf", use_container_width=True)
+            else:
+                progress = st.progress(0.0, text="Génération des livrets...")
+                with ZipSpool() as archive:
+                    for done, (name, pdf) in enumerate(render_pdfs(jobs), 1):
+                        archive.add(name, pdf)
+                        progress.progress(done / len(jobs), text=f"{done} / {len(jobs)} livrets générés")
+                    st.download_button("⬇️ Télécharger les livrets (ZIP)", archive.close().read(),
+                                       file_name=f"presences_{jour_livret}.zip", mime="application/zip",
+                                       use_container_width=True)
+
+    # ── TAB 4 : ÉTUDIANTS À RISQUE ───────────────────────────────────────────────
+    with tab4:
+        st.markdown('<div class="section-header">🚨 Étudiants à risque</div>', unsafe_allow_html=True)
+        c1, c2 = st.columns(2)
+        with c1:
+            seuil_taux = st.slider("Taux de présence minimal (%)", 0, 100, AT_RISK_RATE, key="risk_rate")
+        with c2:
+            seuil_serie = st.number_input("Absences consécutives", min_value=1, value=AT_RISK_STREAK, key="risk_streak")
+        risque = get_attendance().at_risk(seuil_taux, seuil_serie)
+        if risque.empty:
+            st.success("✅ Aucun étudiant à risque selon ces seuils.")
+        else:
+            st.markdown(f"**{len(risque)} étudiant(s) à suivre**")
+            st.dataframe(risque[["Nom Étudiant", "Groupe", "Séances", "Absent", "Taux (%)",
+                                 "Série en cours", "Plus longue série"]],
+                         use_container_width=True, height=400)
+
+        groupe_m = st.selectbox("Matrice des présences du groupe",
+                                df_groupes['Nom Groupe'].tolist() if 'Nom Groupe' in df_groupes.columns else [],
+                                key="risk_groupe")
+        if groupe_m:
+            st.dataframe(get_attendance().matrix(groupe_m), use_container_width=True, height=400)
 
 # ─── Navigation ───────────────────────────────────────────────────────────────
 def sidebar_nav():
@@ -915,6 +2672,12 @@ def sidebar_nav():
             st.rerun()
 
     st.sidebar.markdown("<hr style='border-color: rgba(255,255,255,0.2)'>", unsafe_allow_html=True)
+    if STORAGE_BACKEND == "sqlite":
+        if st.sidebar.button("📤 Exporter le classeur Excel", use_container_width=True):
+            st.sidebar.download_button("⬇️ Télécharger futuro_skills_data.xlsx", export_excel(),
+                                       file_name="futuro_skills_data.xlsx",
+                                       mime="application/vnd.ms-excel",
+                                       use_container_width=True)
     st.sidebar.markdown(f"<div style='font-size:0.75rem; opacity:0.5; text-align:center'>v1.0 — {datetime.now().strftime('%d/%m/%Y')}</div>", unsafe_allow_html=True)
 
 # ─── PAGE : DASHBOARD ──────────────────────────────────────────────────────────
@@ -926,18 +2689,15 @@ def page_dashboard():
     </div>
     """, unsafe_allow_html=True)
 
-    df_etudiants = read_sheet("Étudiants")
-    df_groupes = read_sheet("Groupes")
-    df_profs = read_sheet("Professeurs")
-    df_paie = read_sheet("Paiements")
+    stats = get_stats().snapshot()
 
     c1, c2, c3, c4, c5 = st.columns(5)
-    nb_et = len(df_etudiants)
-    nb_gr = len(df_groupes)
-    nb_pr = len(df_profs)
+    nb_et = stats["nb_etudiants"]
+    nb_gr = stats["nb_groupes"]
+    nb_pr = stats["nb_professeurs"]
 
-    total_du = df_paie['Montant Dû'].sum() if not df_paie.empty and 'Montant Dû' in df_paie.columns else 0
-    total_paye = df_paie['Montant Payé'].sum() if not df_paie.empty and 'Montant Payé' in df_paie.columns else 0
+    total_du = stats["montant_du"]
+    total_paye = stats["montant_paye"]
     
     with c1:
         st.metric("👨‍🎓 Étudiants", nb_et)
@@ -956,36 +2716,37 @@ def page_dashboard():
 
     with col1:
         st.markdown('<div class="section-header">📊 Statut des Paiements</div>', unsafe_allow_html=True)
-        if not df_etudiants.empty and 'Statut Paiement' in df_etudiants.columns:
-            statut_counts = df_etudiants['Statut Paiement'].value_counts()
+        if stats["statuts"]:
+            statut_counts = pd.Series(stats["statuts"]).sort_values(ascending=False)
             st.bar_chart(statut_counts)
         else:
             st.info("Aucune donnée disponible")
 
     with col2:
         st.markdown('<div class="section-header">📚 Étudiants par Groupe</div>', unsafe_allow_html=True)
-        if not df_etudiants.empty and 'Groupe' in df_etudiants.columns:
-            grp_counts = df_etudiants['Groupe'].value_counts()
+        if stats["groupes"]:
+            grp_counts = pd.Series(stats["groupes"]).sort_values(ascending=False)
             st.bar_chart(grp_counts)
         else:
             st.info("Aucune donnée disponible")
 
     st.markdown('<div class="section-header">🔔 Alertes de Paiement Récentes</div>', unsafe_allow_html=True)
-    if not df_etudiants.empty and 'Statut Paiement' in df_etudiants.columns:
-        impayes = df_etudiants[df_etudiants['Statut Paiement'] == 'Impayé']
-        if not impayes.empty:
-            for _, row in impayes.head(5).iterrows():
-                nom = f"{row.get('Prénom','')} {row.get('Nom','')}"
-                grp = row.get('Groupe', 'N/A')
+    if nb_et:
+        if stats["impayes"]:
+            for nom, grp in stats["impayes"]:
                 st.markdown(f"""
                 <div class="alert-danger">
-                    ⚠️ <b>{nom}</b> — Groupe : {grp} — Paiement en attente
+                    ⚠️ <b>{nom}</b> — Groupe : {grp or 'N/A'} — Paiement en attente
                 </div>""", unsafe_allow_html=True)
         else:
             st.success("✅ Tous les étudiants sont à jour dans leurs paiements !")
     else:
         st.info("Enregistrez des étudiants pour voir les alertes.")
 
+    if st.button("🔄 Recalculer les indicateurs"):
+        get_stats().rebuild()
+        st.rerun()
+
 # ─── PAGE : ÉTUDIANTS ──────────────────────────────────────────────────────────
 def page_etudiants():
     st.markdown('<div class="main-title"><h1>👨‍🎓 Gestion des Étudiants</h1><p>CRUD complet — Données stockées dans Excel</p></div>', unsafe_allow_html=True)
@@ -993,11 +2754,11 @@ def page_etudiants():
     df_groupes = read_sheet("Groupes")
     groupes_list = df_groupes['Nom Groupe'].tolist() if not df_groupes.empty and 'Nom Groupe' in df_groupes.columns else []
 
-    tab1, tab2, tab3 = st.tabs(["📋 Liste des Étudiants", "➕ Nouvel Étudiant", "✏️ Modifier / Supprimer"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Liste des Étudiants", "➕ Nouvel Étudiant",
+                                      "✏️ Modifier / Supprimer", "📥 Import en masse"])
 
     with tab1:
-        df = read_sheet("Étudiants")
-        if df.empty:
+        if query_sheet("Étudiants", limit=0)[1] == 0:
             st.info("Aucun étudiant enregistré.")
         else:
             col_f1, col_f2 = st.columns(2)
@@ -1006,24 +2767,16 @@ def page_etudiants():
             with col_f2:
                 filtre_grp = st.selectbox("Filtrer par groupe", ["Tous"] + groupes_list)
             
-            filtered = df.copy()
-            if search:
-                mask = filtered.apply(lambda r: search.lower() in str(r).lower(), axis=1)
-                filtered = filtered[mask]
-            if filtre_grp != "Tous" and 'Groupe' in filtered.columns:
-                filtered = filtered[filtered['Groupe'] == filtre_grp]
-            
-            st.markdown(f"**{len(filtered)} étudiant(s) trouvé(s)**")
-            
-            if 'Statut Paiement' in filtered.columns:
-                def color_statut(val):
-                    if val == 'Payé': return 'background-color: #c6f6d5; color: #276749'
-                    elif val == 'Impayé': return 'background-color: #fed7d7; color: #9b2c2c'
-                    return 'background-color: #feebc8; color: #7b341e'
-                st.dataframe(filtered.style.applymap(color_statut, subset=['Statut Paiement']),
-                             use_container_width=True, height=400)
-            else:
-                st.dataframe(filtered, use_container_width=True, height=400)
+            filters = {"Groupe": filtre_grp} if filtre_grp != "Tous" else None
+            found = search_frame(read_sheet("Étudiants"), "Étudiants", search) if search else None
+            count_slot = st.empty()
+
+            def color_statut(val):
+                if val == 'Payé': return 'background-color: #c6f6d5; color: #276749'
+                elif val == 'Impayé': return 'background-color: #fed7d7; color: #9b2c2c'
+                return 'background-color: #feebc8; color: #7b341e'
+            total = paged_table("etudiants", "Étudiants", filters, found, ('Statut Paiement', color_statut))
+            count_slot.markdown(f"**{total} étudiant(s) trouvé(s)**")
 
     with tab2:
         st.markdown('<div class="section-header">➕ Formulaire d\'Inscription</div>', unsafe_allow_html=True)
@@ -1044,28 +2797,28 @@ def page_etudiants():
             submitted = st.form_submit_button("✅ Inscrire l'Étudiant", use_container_width=True, type="primary")
 
             if submitted:
-                if not prenom or not nom or not email or groupe == "-- Choisir --":
-                    st.error("Veuillez remplir tous les champs obligatoires (*)")
+                saisie = {"Prénom": prenom, "Nom": nom, "Email": email, "Téléphone": tel,
+                          "Groupe": "" if groupe == "-- Choisir --" else groupe}
+                manquants = missing_fields(saisie)
+                if manquants:
+                    st.error("Veuillez remplir tous les champs obligatoires (*) : " + ", ".join(manquants))
                 else:
-                    df_ex = read_sheet("Étudiants")
-                    new_id = next_id(df_ex, "ID")
-                    row = [new_id, prenom, nom, email, tel, str(dob), adresse, groupe,
+                    et_id = new_id("Étudiants")
+                    row = [et_id, prenom, nom, email, tel, str(dob), adresse, groupe,
                            str(date.today()), frais, statut_paie]
                     append_row("Étudiants", row)
 
                     # Aussi dans Inscriptions
-                    df_insc = read_sheet("Inscriptions")
-                    df_pr = read_sheet("Professeurs")
                     prof_nom = ""
                     if not df_groupes.empty and 'Nom Groupe' in df_groupes.columns:
                         grp_row = df_groupes[df_groupes['Nom Groupe'] == groupe]
                         if not grp_row.empty:
                             prof_nom = grp_row.iloc[0].get('Professeur', '')
 
-                    insc_id = next_id(df_insc, "ID Inscription")
-                    append_row("Inscriptions", [insc_id, new_id, f"{prenom} {nom}", groupe,
+                    insc_id = new_id("Inscriptions")
+                    append_row("Inscriptions", [insc_id, et_id, f"{prenom} {nom}", groupe,
                                                 prof_nom, str(date.today()), frais, statut_paie])
-                    st.success(f"✅ {prenom} {nom} a été inscrit avec succès ! (ID: {new_id})")
+                    st.success(f"✅ {prenom} {nom} a été inscrit avec succès ! (ID: {et_id})")
                     st.balloons()
 
     with tab3:
@@ -1108,6 +2861,29 @@ def page_etudiants():
                         st.warning(f"⚠️ Étudiant {selected_label} supprimé.")
                         st.rerun()
 
+    with tab4:
+        st.markdown('<div class="section-header">📥 Import CSV / Excel</div>', unsafe_allow_html=True)
+        st.caption("Colonnes obligatoires : " + ", ".join(ETUDIANT_REQUIRED)
+                   + " — optionnelles : " + ", ".join(IMPORT_OPTIONAL))
+        fichier = st.file_uploader("Fichier à importer", type=["csv", "xlsx"])
+        if fichier is not None:
+            try:
+                df_import = read_import_file(fichier)
+            except Exception as e:
+                st.error(f"Lecture impossible : {e}")
+                df_import = None
+            if df_import is not None:
+                valid, errors = validate_import(df_import, df_groupes, read_sheet("Étudiants"))
+                c1, c2 = st.columns(2)
+                c1.metric("✅ Lignes valides", len(valid))
+                c2.metric("❌ Lignes rejetées", len(errors))
+                if not errors.empty:
+                    st.dataframe(errors, use_container_width=True, hide_index=True)
+                if not valid.empty and st.button(f"📥 Importer {len(valid)} étudiant(s)",
+                                                 use_container_width=True, type="primary"):
+                    n, _ = import_etudiants(df_import, df_groupes)
+                    st.success(f"✅ {n} étudiant(s) importé(s) et inscrit(s).")
+
 # ─── PAGE : GROUPES ────────────────────────────────────────────────────────────
 def page_groupes():
     st.markdown('<div class="main-title"><h1>📚 Gestion des Groupes</h1><p>Créer, modifier et organiser les groupes de formation</p></div>', unsafe_allow_html=True)
@@ -1182,9 +2958,8 @@ def page_groupes():
                 if not nom_grp or prof == "-- Choisir --":
                     st.error("Nom du groupe et professeur obligatoires.")
                 else:
-                    df_ex = read_sheet("Groupes")
-                    new_id = next_id(df_ex, "ID Groupe")
-                    append_row("Groupes", [new_id, nom_grp, prof, niveau, horaire, salle,
+                    grp_id = new_id("Groupes")
+                    append_row("Groupes", [grp_id, nom_grp, prof, niveau, horaire, salle,
                                            str(date_debut), str(date_fin), frais_grp, capacite, 0])
                     st.success(f"✅ Groupe '{nom_grp}' créé avec succès !")
                     st.rerun()
@@ -1207,25 +2982,28 @@ def page_professeurs():
             st.dataframe(df, use_container_width=True)
 
             st.markdown('<div class="section-header">💰 Calcul des Commissions</div>', unsafe_allow_html=True)
-            for _, prof_row in df.iterrows():
-                prof_nom = f"{prof_row.get('Prénom','')} {prof_row.get('Nom','')}"
-                
-                total_comm = 0
-                if not df_groupes.empty and 'Professeur' in df_groupes.columns:
-                    groupes_prof = df_groupes[df_groupes['Professeur'] == prof_nom]['Nom Groupe'].tolist()
-                    if not df_paie.empty and 'Groupe' in df_paie.columns and 'Montant Payé' in df_paie.columns:
-                        for g in groupes_prof:
-                            montant_g = df_paie[df_paie['Groupe'] == g]['Montant Payé'].sum()
-                            total_comm += montant_g * 0.50
+            dates_paie = pd.to_datetime(df_paie.reindex(columns=['Date Paiement'])['Date Paiement'], errors="coerce")
+            mois_dispo = sorted(dates_paie.dropna().dt.strftime("%Y-%m").unique(), reverse=True)
+            periode = st.selectbox("Période", ["Toutes périodes"] + mois_dispo)
+            debut, fin = month_bounds(periode) if periode != "Toutes périodes" else (None, None)
 
+            lignes = compute_payroll(df_paie, df_groupes, df, debut, fin)
+            par_prof = payroll_by_prof(lignes, df).set_index("Professeur")
+            nb_par_groupe = df_etudiants['Groupe'].value_counts() if not df_etudiants.empty and 'Groupe' in df_etudiants.columns else pd.Series(dtype=int)
+            groupes_par_prof = df_groupes.groupby('Professeur') if not df_groupes.empty and 'Professeur' in df_groupes.columns else None
+
+            for prof_nom, total_comm in par_prof['Commission'].items():
                 with st.expander(f"👨‍🏫 {prof_nom} — Commission estimée : {total_comm:,.0f} MAD"):
-                    if not df_groupes.empty and 'Professeur' in df_groupes.columns:
-                        groupes_p = df_groupes[df_groupes['Professeur'] == prof_nom]
-                        if not groupes_p.empty:
-                            st.write("**Groupes assignés :**")
-                            for _, g in groupes_p.iterrows():
-                                nb_et = len(df_etudiants[df_etudiants['Groupe'] == g['Nom Groupe']]) if not df_etudiants.empty and 'Groupe' in df_etudiants.columns else 0
-                                st.markdown(f"- 📚 **{g.get('Nom Groupe','')}** — {nb_et} étudiant(s) — {g.get('Horaire','')}")
+                    if groupes_par_prof is not None and prof_nom in groupes_par_prof.groups:
+                        st.write("**Groupes assignés :**")
+                        for g in groupes_par_prof.get_group(prof_nom).to_dict("records"):
+                            nb_et = nb_par_groupe.get(g.get('Nom Groupe'), 0)
+                            st.markdown(f"- 📚 **{g.get('Nom Groupe','')}** — {nb_et} étudiant(s) — {g.get('Horaire','')}")
+
+            cached_download("paie", "Exporter la paie (Excel)",
+                            f"paie_professeurs_{periode.replace(' ', '_')}.xlsx", periode,
+                            lambda: export_payroll(lignes, df).getvalue(),
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
     with tab2:
         st.markdown('<div class="section-header">➕ Ajouter un Professeur</div>', unsafe_allow_html=True)
@@ -1245,9 +3023,8 @@ def page_professeurs():
                 if not p_prenom or not p_nom or not p_email:
                     st.error("Prénom, Nom et Email obligatoires.")
                 else:
-                    df_ex = read_sheet("Professeurs")
-                    new_id = next_id(df_ex, "ID")
-                    append_row("Professeurs", [new_id, p_prenom, p_nom, p_email, p_tel, p_spec, p_taux, ""])
+                    prof_id = new_id("Professeurs")
+                    append_row("Professeurs", [prof_id, p_prenom, p_nom, p_email, p_tel, p_spec, p_taux, ""])
                     st.success(f"✅ Prof. {p_prenom} {p_nom} ajouté !")
                     st.rerun()
 
@@ -1265,8 +3042,9 @@ def page_paiements():
             st.info("Aucun paiement enregistré.")
         else:
             col1, col2, col3 = st.columns(3)
-            total_paie = df['Montant Payé'].sum() if 'Montant Payé' in df.columns else 0
-            total_du = df['Montant Dû'].sum() if 'Montant Dû' in df.columns else 0
+            stats = get_stats().snapshot()
+            total_paie = stats["montant_paye"]
+            total_du = stats["montant_du"]
             with col1:
                 st.metric("💵 Total Encaissé", f"{total_paie:,.0f} MAD")
             with col2:
@@ -1274,14 +3052,9 @@ def page_paiements():
             with col3:
                 st.metric("⚠️ Solde Restant", f"{total_du - total_paie:,.0f} MAD")
             
-            st.dataframe(df, use_container_width=True, height=400)
-
-            buf = io.BytesIO()
-            with pd.ExcelWriter(buf, engine='openpyxl') as writer:
-                df.write_excel(writer) if hasattr(df, 'write_excel') else df.to_excel(writer, index=False)
-            buf.seek(0)
-            st.download_button("⬇️ Exporter les paiements (Excel)", buf,
-                               file_name="paiements_futuro.xlsx", mime="application/vnd.ms-excel")
+            paged_table("paiements", "Paiements")
+            export_button("paiements", "Exporter les paiements (Excel)", "paiements_futuro.xlsx",
+                          "Paiements")
 
     with tab2:
         st.markdown('<div class="section-header">➕ Enregistrer un Paiement</div>', unsafe_allow_html=True)
@@ -1302,25 +3075,29 @@ def page_paiements():
                 et_groupe = et_row.get('Groupe', '') if et_row is not None else ""
                 et_frais = float(et_row.get('Frais Total', 0) or 0) if et_row is not None else 0
 
-                st.info(f"📋 Groupe : **{et_groupe}** | Frais total : **{et_frais:,.0f} MAD**")
+                deja_paye = get_ledger().get(et_id)["Total Payé"] if et_id else 0.0
+                reste_du = max(et_frais - deja_paye, 0.0)
+                st.info(f"📋 Groupe : **{et_groupe}** | Frais total : **{et_frais:,.0f} MAD**"
+                        f" | Déjà payé : **{deja_paye:,.0f} MAD** | Reste : **{reste_du:,.0f} MAD**")
 
                 c1, c2 = st.columns(2)
                 with c1:
-                    montant_paye = st.number_input("Montant Payé (MAD) *", min_value=0.0, value=et_frais, step=100.0)
+                    montant_paye = st.number_input("Montant Payé (MAD) *", min_value=0.0, value=reste_du, step=100.0)
                     mode = st.selectbox("Mode de Paiement", ["Espèces", "Virement", "Chèque", "Mobile Money"])
                 with c2:
                     montant_du = st.number_input("Montant Dû Total (MAD)", min_value=0.0, value=et_frais, step=100.0)
                     date_paie = st.date_input("Date de Paiement", value=date.today())
 
-                statut = "Payé" if montant_paye >= montant_du else ("Partiel" if montant_paye > 0 else "Impayé")
+                # statut sur le cumul des versements, pas sur ce seul paiement
+                cumul = deja_paye + montant_paye
+                statut = "Payé" if cumul >= montant_du else ("Partiel" if cumul > 0 else "Impayé")
                 st.markdown(f"**Statut calculé :** {'🟢 Payé' if statut == 'Payé' else ('🟡 Partiel' if statut == 'Partiel' else '🔴 Impayé')}")
                 notes = st.text_area("Notes", height=60)
 
                 sub = st.form_submit_button("✅ Enregistrer le Paiement", use_container_width=True, type="primary")
                 if sub:
-                    df_p = read_sheet("Paiements")
-                    new_id = next_id(df_p, "ID Paiement")
-                    append_row("Paiements", [new_id, et_id, et_nom, et_groupe,
+                    paie_id = new_id("Paiements")
+                    append_row("Paiements", [paie_id, et_id, et_nom, et_groupe,
                                              montant_paye, montant_du, str(date_paie), mode, statut, notes])
                     # Mettre à jour statut étudiant
                     update_row("Étudiants", "ID", et_id, {"Statut Paiement": statut})
@@ -1348,23 +3125,17 @@ def page_inscriptions():
         search = st.text_input("🔍 Rechercher une inscription")
         filtered = df
         if search:
-            mask = df.apply(lambda r: search.lower() in str(r).lower(), axis=1)
-            filtered = df[mask]
-        st.dataframe(filtered, use_container_width=True, height=500)
-
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine='openpyxl') as w:
-            filtered.to_excel(w, index=False)
-        buf.seek(0)
-        st.download_button("⬇️ Exporter (Excel)", buf, file_name="inscriptions_futuro.xlsx",
-                           mime="application/vnd.ms-excel")
+            filtered = search_frame(df, "Inscriptions", search)
+        paged_table("inscriptions", "Inscriptions", frame=filtered if search else None, height=500)
+        export_button("inscriptions", "Exporter (Excel)", "inscriptions_futuro.xlsx",
+                      "Inscriptions", search=search)
 
 # ─── PAGE : ALERTES ───────────────────────────────────────────────────────────
 def page_alertes():
     st.markdown('<div class="main-title"><h1>🔔 Alertes de Paiement</h1><p>Suivre les paiements en retard ou en attente</p></div>', unsafe_allow_html=True)
 
     df_et = read_sheet("Étudiants")
-    df_paie = read_sheet("Paiements")
+    ledger = get_ledger()
 
     if df_et.empty:
         st.info("Aucun étudiant enregistré.")
@@ -1403,17 +3174,17 @@ def page_alertes():
                     grp = row.get('Groupe', 'N/A')
                     frais = float(row.get('Frais Total', 0) or 0)
 
-                    total_paye = 0
-                    if not df_paie.empty and 'ID Étudiant' in df_paie.columns:
-                        paiements_et = df_paie[df_paie['ID Étudiant'] == row.get('ID')]
-                        total_paye = paiements_et['Montant Payé'].sum() if not paiements_et.empty and 'Montant Payé' in paiements_et.columns else 0
+                    compte = ledger.get(row.get('ID'))
+                    total_paye = compte["Total Payé"]
+                    dernier = compte["Dernier Paiement"] or "—"
 
                     reste = frais - total_paye
                     st.markdown(f"""
                     <div class="alert-warning">
                         <b>⚠️ {nom}</b><br>
                         📚 Groupe: {grp}<br>
-                        💵 Payé: {total_paye:,.0f} MAD | Reste: <b>{reste:,.0f} MAD</b>
+                        💵 Payé: {total_paye:,.0f} MAD | Reste: <b>{reste:,.0f} MAD</b><br>
+                        🗓️ Dernier paiement: {dernier} ({compte["Nb Paiements"]} versement(s))
                     </div>""", unsafe_allow_html=True)
 
     st.markdown("---")
@@ -1440,6 +3211,9 @@ def page_pdf():
         st.warning("⚠️ Aucun groupe créé. Créez d'abord des groupes.")
         return
 
+    paie_par_groupe = (compute_payroll(df_paie, df_groupes, read_sheet("Professeurs"))
+                       .drop_duplicates("Groupe").set_index("Groupe"))
+
     st.markdown('<div class="section-header">🖨️ Sélectionner un groupe à imprimer</div>', unsafe_allow_html=True)
 
     col1, col2 = st.columns(2)
@@ -1475,7 +3249,8 @@ def page_pdf():
     st.markdown("---")
     if st.button("🖨️ Générer le PDF du Groupe", use_container_width=True, type="primary"):
         with st.spinner("Génération du PDF..."):
-            pdf_buf = generate_pdf_groupe(groupe_sel, professeur, etudiants_grp, df_paie)
+            pdf_buf = cached_pdf("groupe", (groupe_sel, professeur, etudiants_grp,
+                                            paie_par_groupe.loc[groupe_sel].to_dict()))
         st.success("✅ PDF généré avec succès !")
         st.download_button(
             label=f"⬇️ Télécharger PDF — {groupe_sel}",
@@ -1487,24 +3262,46 @@ def page_pdf():
 
     st.markdown("---")
     st.markdown('<div class="section-header">📦 Exporter tous les groupes</div>', unsafe_allow_html=True)
+    keep_archive = st.checkbox("Conserver l'archive sur le serveur pour un téléchargement ultérieur")
     if st.button("📄 Générer PDFs de TOUS les groupes (ZIP)", use_container_width=True):
-        import zipfile
-        zip_buf = io.BytesIO()
-        with zipfile.ZipFile(zip_buf, 'w') as zf:
-            for _, g in df_groupes.iterrows():
-                g_nom = g.get('Nom Groupe', '')
-                g_prof = g.get('Professeur', '')
-                g_et = df_etudiants[df_etudiants['Groupe'] == g_nom] if not df_etudiants.empty and 'Groupe' in df_etudiants.columns else pd.DataFrame()
-                pdf = generate_pdf_groupe(g_nom, g_prof, g_et, df_paie)
-                zf.writestr(f"groupe_{g_nom.replace(' ','_')}.pdf", pdf.read())
-        zip_buf.seek(0)
-        st.download_button("⬇️ Télécharger tous les PDFs (ZIP)", zip_buf,
-                           file_name="futuro_groupes_pdfs.zip", mime="application/zip",
-                           use_container_width=True)
+        jobs = group_pdf_jobs(df_groupes, df_etudiants, paie_par_groupe)
+        progress = st.progress(0.0, text="Génération des PDF...")
+        with ZipSpool() as archive:
+            for done, (name, pdf) in enumerate(render_pdfs(jobs), 1):
+                archive.add(name, pdf)
+                progress.progress(done / len(jobs), text=f"{done} / {len(jobs)} PDF générés")
+            if keep_archive:
+                filename = f"futuro_groupes_pdfs_{datetime.now():%Y%m%d_%H%M%S}.zip"
+                archive.save(filename)
+                st.success(f"✅ Archive conservée : {filename}")
+            # st.download_button veut des octets : l'archive n'est lue qu'une fois, terminée
+            st.download_button("⬇️ Télécharger tous les PDFs (ZIP)", archive.close().read(),
+                               file_name="futuro_groupes_pdfs.zip", mime="application/zip",
+                               use_container_width=True)
+
+    archives = stored_archives()
+    if archives:
+        with st.expander(f"📁 Archives conservées ({len(archives)})"):
+            tailles = {e.name: e.stat().st_size for e in archives}
+            choix = st.selectbox("Archive", list(tailles),
+                                 format_func=lambda n: f"{n} ({tailles[n] / 1e6:.1f} Mo)")
+            col1, col2 = st.columns(2)
+            with col1:
+                # le fichier n'est lu qu'à la demande, pas à chaque réexécution
+                if st.button("📦 Préparer le téléchargement", use_container_width=True):
+                    with open(os.path.join(ARCHIVE_DIR, choix), "rb") as f:
+                        st.download_button("⬇️ Télécharger l'archive", f, file_name=choix,
+                                           mime="application/zip", use_container_width=True)
+            with col2:
+                if st.button("🗑️ Supprimer l'archive", use_container_width=True):
+                    os.remove(os.path.join(ARCHIVE_DIR, choix))
+                    st.rerun()
 
 # ─── MAIN ─────────────────────────────────────────────────────────────────────
 def main():
-    init_excel()
+    st.set_page_config(**PAGE_CONFIG)
+    st.markdown(CSS, unsafe_allow_html=True)
+    init_storage()
     sidebar_nav()
 
     page = st.session_state.get("page", "dashboard")
@@ -1522,5 +3319,45 @@ def main():
     }
     pages.get(page, page_dashboard)()
 
+# ─── Ligne de commande ────────────────────────────────────────────────────────
+# python futuro.py import-etudiants fichier.csv [--dry-run]
+# python futuro.py payroll [--mois 2026-10] [-o paie.xlsx]
+# (sous "streamlit run futuro.py", c'est l'application qui démarre)
+def cli(argv):
+    parser = argparse.ArgumentParser(prog="futuro.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_imp = sub.add_parser("import-etudiants", help="importer des étudiants depuis un CSV/XLSX")
+    p_imp.add_argument("fichier")
+    p_imp.add_argument("--dry-run", action="store_true", help="valider sans écrire")
+    p_paie = sub.add_parser("payroll", help="calculer la paie des professeurs")
+    p_paie.add_argument("--mois", help="AAAA-MM (par défaut : toutes périodes)")
+    p_paie.add_argument("-o", "--output", help="fichier .xlsx à écrire")
+    args = parser.parse_args(argv)
+
+    init_storage()
+    if args.command == "import-etudiants":
+        df = read_import_file(args.fichier)
+        if args.dry_run:
+            valid, errors = validate_import(df, read_sheet("Groupes"), read_sheet("Étudiants"))
+            print(f"{len(valid)} ligne(s) valide(s)")
+        else:
+            n, errors = import_etudiants(df)
+            print(f"{n} étudiant(s) importé(s)")
+        if not errors.empty:
+            print(errors.to_string(index=False))
+        return 1 if not errors.empty else 0
+    if args.command == "payroll":
+        debut, fin = month_bounds(args.mois) if args.mois else (None, None)
+        df_profs = read_sheet("Professeurs")
+        lignes = compute_payroll(read_sheet("Paiements"), read_sheet("Groupes"), df_profs, debut, fin)
+        if args.output:
+            with open(args.output, "wb") as f:
+                f.write(export_payroll(lignes, df_profs).getvalue())
+        print(payroll_by_prof(lignes, df_profs).to_string(index=False))
+        return 0
+
 if __name__ == "__main__":
-    main()
+    if st.runtime.exists():
+        main()
+    else:
+        sys.exit(cli(sys.argv[1:]))
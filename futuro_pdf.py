@@ -0,0 +1,259 @@
+# Génération des PDF (reportlab), sans dépendance à Streamlit : ce module est
+# importé par l'application et par les processus de rendu en parallèle.
+import io
+import sys
+import threading
+from datetime import datetime
+from multiprocessing.context import SpawnContext, SpawnProcess
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, HRFlowable, PageBreak
+from futuro_templates import (
+    GROUPE_STYLES, GROUPE_STATS_STYLE, GROUPE_LISTE_STYLE, GROUPE_REMUNERATION_STYLE,
+    PRESENCE_STYLES, PRESENCE_INFO_STYLE, PRESENCE_LISTE_STYLE, PRESENCE_STATS_STYLE,
+    PRESENCE_SIGNATURE_STYLE, STATUTS_PAIEMENT, STATUT_PAIEMENT_AUTRE, STATUTS_PRESENCE,
+    ACCENT, GRILLE, colorer_statuts)
+
+# À incrémenter à chaque changement de mise en page : invalide le cache des PDF
+TEMPLATE_VERSION = 3
+
+# ─── Génération PDF Groupe ──────────────────────────────────────────────────────
+def generate_pdf_groupe(groupe_nom, professeur, etudiants_df, remuneration):
+    # remuneration : ligne de compute_payroll() pour ce groupe (dict ou Series)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4,
+                            topMargin=1.5*cm, bottomMargin=1.5*cm,
+                            leftMargin=1.5*cm, rightMargin=1.5*cm)
+    story = []
+    styles = GROUPE_STYLES
+    title_style, subtitle_style, info_style = styles['title'], styles['sub'], styles['info']
+
+    # Header
+    story.append(Paragraph("🎓 FUTURO SKILLS ACADEMY", title_style))
+    story.append(Paragraph(f"Liste du Groupe : {groupe_nom}", subtitle_style))
+    story.append(Paragraph(f"Professeur : {professeur}  |  Date d'impression : {datetime.now().strftime('%d/%m/%Y %H:%M')}", info_style))
+    story.append(HRFlowable(width="100%", thickness=2, color=ACCENT, spaceAfter=12))
+
+    # Stats
+    nb = len(etudiants_df)
+    payes = len(etudiants_df[etudiants_df.get("Statut Paiement", pd.Series([])) == "Payé"]) if not etudiants_df.empty and "Statut Paiement" in etudiants_df.columns else 0
+    
+    stats_data = [
+        ['📊 Statistiques du Groupe', '', ''],
+        [f'Total étudiants: {nb}', f'Payés: {payes}', f'En attente: {nb - payes}'],
+    ]
+    stats_table = Table(stats_data, colWidths=[6*cm, 5*cm, 5*cm])
+    stats_table.setStyle(GROUPE_STATS_STYLE)
+    story.append(stats_table)
+    story.append(Spacer(1, 15))
+
+    # Liste étudiants
+    story.append(Paragraph("📋 Liste des Étudiants", subtitle_style))
+    story.append(Spacer(1, 8))
+
+    if etudiants_df.empty:
+        story.append(Paragraph("Aucun étudiant dans ce groupe.", info_style))
+    else:
+        headers = ['N°', 'Prénom', 'Nom', 'Téléphone', 'Email', 'Statut Paiement']
+        cols = etudiants_df.reindex(columns=headers[1:], fill_value='')
+        statuts = etudiants_df.reindex(columns=['Statut Paiement'], fill_value='N/A')['Statut Paiement'].astype(str)
+        cols['Statut Paiement'] = statuts
+        table_data = [headers] + [[str(i), *row] for i, row in
+                                  enumerate(cols.astype(str).itertuples(index=False), 1)]
+
+        col_widths = [1*cm, 3.5*cm, 3.5*cm, 3*cm, 4.5*cm, 3*cm]
+        t = Table(table_data, colWidths=col_widths, repeatRows=1)
+        t.setStyle(GROUPE_LISTE_STYLE)
+        colorer_statuts(t, 5, statuts, STATUTS_PAIEMENT, autre=STATUT_PAIEMENT_AUTRE)
+        story.append(t)
+
+    # Paiement professeur
+    story.append(Spacer(1, 20))
+    story.append(HRFlowable(width="100%", thickness=1, color=GRILLE, spaceAfter=12))
+    story.append(Paragraph("💰 Rémunération du Professeur", subtitle_style))
+    story.append(Spacer(1, 8))
+
+    total_encaisse = remuneration['Total Encaissé']
+    taux = remuneration['Taux Commission (%)']
+    commission = remuneration['Commission']
+
+    pay_data = [
+        ['Description', 'Montant'],
+        ['Total encaissé du groupe', f'{total_encaisse:,.0f} MAD'],
+        [f'Commission professeur ({taux:g}%)', f'{commission:,.0f} MAD'],
+    ]
+    pay_table = Table(pay_data, colWidths=[10*cm, 6.5*cm])
+    pay_table.setStyle(GROUPE_REMUNERATION_STYLE)
+    story.append(pay_table)
+
+    # Footer
+    story.append(Spacer(1, 20))
+    story.append(HRFlowable(width="100%", thickness=1, color=GRILLE, spaceAfter=8))
+    story.append(Paragraph("Futuro Skills Academy — Document confidentiel — Imprimé le " + datetime.now().strftime('%d/%m/%Y'), styles['footer']))
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+# ─── Génération PDF Feuille de Présence ───────────────────────────────────────
+LETTRES_PRESENCE = {'Présent': 'P', 'Absent': 'A', 'Retard': 'R', 'Excusé': 'E'}
+
+def _presence_doc(buffer):
+    return SimpleDocTemplate(buffer, pagesize=A4,
+                             topMargin=1.2*cm, bottomMargin=1.5*cm,
+                             leftMargin=1.5*cm, rightMargin=1.5*cm)
+
+def _presence_story(groupe_nom, professeur, date_seance, num_seance,
+                    horaire, salle, etudiants_df, presences_dict, imprime_le):
+    # Éléments d'une feuille de présence, à mettre seule dans un document ou
+    # à la suite d'autres feuilles dans un livret
+    styles = PRESENCE_STYLES
+    label_style = styles['label']
+    story = []
+
+    # ── Header ──
+    story.append(Paragraph("FUTURO SKILLS ACADEMY", styles['title']))
+    story.append(Paragraph("FEUILLE DE PRESENCE", styles['sub']))
+    story.append(HRFlowable(width="100%", thickness=2, color=ACCENT, spaceAfter=8))
+
+    # ── Info bloc ──
+    date_str = date_seance.strftime('%A %d %B %Y').capitalize() if hasattr(date_seance, 'strftime') else str(date_seance)
+    info_data = [
+        [Paragraph('<b>Groupe :</b>', label_style), Paragraph(str(groupe_nom), label_style),
+         Paragraph('<b>Seance N° :</b>', label_style), Paragraph(str(num_seance), label_style)],
+        [Paragraph('<b>Professeur :</b>', label_style), Paragraph(str(professeur), label_style),
+         Paragraph('<b>Date :</b>', label_style), Paragraph(date_str, label_style)],
+        [Paragraph('<b>Horaire :</b>', label_style), Paragraph(str(horaire), label_style),
+         Paragraph('<b>Salle :</b>', label_style), Paragraph(str(salle), label_style)],
+    ]
+    info_table = Table(info_data, colWidths=[3.2*cm, 6*cm, 3.2*cm, 5.1*cm])
+    info_table.setStyle(PRESENCE_INFO_STYLE)
+    story.append(info_table)
+    story.append(Spacer(1, 10))
+
+    # ── Tableau présences ──
+    nb_et = len(etudiants_df)
+
+    headers = ['N°', 'Nom et Prénom', 'Statut', 'Signature']
+    has_data = bool(presences_dict)
+
+    # P / A / R / E, ou case vide à remplir à la main
+    cols = etudiants_df.reindex(columns=['ID', 'Prénom', 'Nom'], fill_value='').astype(str)
+    statuts = cols['ID'].map(presences_dict).map(LETTRES_PRESENCE).fillna('')
+    noms = cols['Prénom'] + ' ' + cols['Nom']
+    table_data = [headers] + [[str(i), nom, statut, ''] for i, (nom, statut) in
+                              enumerate(zip(noms, statuts), 1)]
+
+    row_h = 1.1*cm
+    col_widths = [1.2*cm, 9*cm, 2.5*cm, 4.8*cm]
+    t = Table(table_data, colWidths=col_widths, rowHeights=[0.8*cm] + [row_h]*nb_et, repeatRows=1)
+
+    t.setStyle(PRESENCE_LISTE_STYLE)
+    colorer_statuts(t, 2, [row[2] for row in table_data[1:]], STATUTS_PRESENCE)
+    story.append(t)
+    story.append(Spacer(1, 10))
+
+    # ── Légende ──
+    story.append(Paragraph(
+        "<b>Légende :</b>  P = Présent   |   A = Absent   |   R = Retard   |   E = Excusé",
+        styles['leg']))
+    story.append(Spacer(1, 14))
+
+    # ── Stats si données ──
+    if has_data and nb_et > 0:
+        vals = list(presences_dict.values())
+        nb_p = vals.count('Présent')
+        nb_a = vals.count('Absent')
+        nb_r = vals.count('Retard')
+        nb_e = vals.count('Excusé')
+        taux = round(nb_p / nb_et * 100) if nb_et else 0
+
+        stat_data = [
+            ['Présents', 'Absents', 'Retards', 'Excusés', 'Taux de présence'],
+            [str(nb_p), str(nb_a), str(nb_r), str(nb_e), f'{taux} %'],
+        ]
+        st_table = Table(stat_data, colWidths=[3.5*cm]*5)
+        st_table.setStyle(PRESENCE_STATS_STYLE)
+        story.append(st_table)
+        story.append(Spacer(1, 14))
+
+    # ── Signatures ──
+    sig_data = [
+        ['Signature du Professeur', 'Visa Direction / Administration'],
+        ['\n\n\n\n', '\n\n\n\n'],
+    ]
+    sig_table = Table(sig_data, colWidths=[8.75*cm, 8.75*cm])
+    sig_table.setStyle(PRESENCE_SIGNATURE_STYLE)
+    story.append(sig_table)
+
+    # ── Footer ──
+    story.append(Spacer(1, 10))
+    story.append(HRFlowable(width="100%", thickness=0.5, color=GRILLE, spaceAfter=4))
+    story.append(Paragraph(
+        f"Futuro Skills Academy — Feuille de présence confidentielle — Imprimée le {imprime_le}",
+        styles['footer']))
+    return story
+
+def generate_pdf_presence(groupe_nom, professeur, date_seance, num_seance,
+                           horaire, salle, etudiants_df, presences_dict):
+    buffer = io.BytesIO()
+    story = _presence_story(groupe_nom, professeur, date_seance, num_seance,
+                            horaire, salle, etudiants_df, presences_dict,
+                            datetime.now().strftime('%d/%m/%Y à %H:%M'))
+    _presence_doc(buffer).build(story)
+    buffer.seek(0)
+    return buffer
+
+def generate_pdf_livret_presence(date_seance, seances):
+    # Livret : une feuille par groupe (chacune sur une nouvelle page) dans un
+    # seul document. seances : liste de (groupe, professeur, n° séance,
+    # horaire, salle, étudiants, présences), les étudiants déjà découpés par groupe.
+    buffer = io.BytesIO()
+    imprime_le = datetime.now().strftime('%d/%m/%Y à %H:%M')
+    story = []
+    for i, (groupe_nom, professeur, num_seance, horaire, salle, etudiants_df, presences_dict) in enumerate(seances):
+        if i:
+            story.append(PageBreak())
+        story.extend(_presence_story(groupe_nom, professeur, date_seance, num_seance,
+                                     horaire, salle, etudiants_df, presences_dict, imprime_le))
+    _presence_doc(buffer).build(story)
+    buffer.seek(0)
+    return buffer
+
+# ─── Rendu en lot ──────────────────────────────────────────────────────────────
+RENDERERS = {
+    "groupe": generate_pdf_groupe,
+    "presence": generate_pdf_presence,
+    "livret_presence": generate_pdf_livret_presence,
+}
+
+def render_job(job):
+    # job : (nom de fichier, type de PDF, arguments) ; exécuté dans un processus
+    # du pool, renvoie des octets (un BytesIO ne traverse pas les processus)
+    name, kind, args = job
+    return name, RENDERERS[kind](*args).getvalue()
+
+# ─── Processus de rendu ─────────────────────────────────────────────────────────
+_main_lock = threading.Lock()
+
+class _PdfWorker(SpawnProcess):
+    # Un processus "spawn" ré-exécute le fichier de __main__ (en __mp_main__)
+    # avant de servir ; sous `streamlit run`, c'est futuro.py tout entier
+    # (set_page_config, CSS, pages…). On masque ce chemin le temps du
+    # lancement : le processus n'importe alors que ce module. La classe vit ici
+    # parce que le processus la dépickle à son démarrage.
+    @staticmethod
+    def _Popen(process_obj):
+        main = sys.modules["__main__"]
+        with _main_lock:
+            path = main.__dict__.pop("__file__", None)
+            try:
+                return SpawnProcess._Popen(process_obj)
+            finally:
+                if path is not None:
+                    main.__file__ = path
+
+class PdfContext(SpawnContext):
+    # contexte "spawn" des pools de rendu PDF
+    Process = _PdfWorker
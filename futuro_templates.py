@@ -0,0 +1,164 @@
+# Gabarits des rapports PDF : couleurs, styles de paragraphe et prototypes de
+# TableStyle compilés une seule fois à l'import, puis partagés par tous les
+# documents (et par chaque processus de rendu). Pas de dépendance à Streamlit.
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import TableStyle
+
+# ─── Palette ──────────────────────────────────────────────────────────────────
+ENCRE      = colors.HexColor('#1a1a2e')
+ACCENT     = colors.HexColor('#667eea')
+FOND_DOUX  = colors.HexColor('#f0f2ff')
+FOND_DOUX2 = colors.HexColor('#e8eaf6')
+BORD_INFO  = colors.HexColor('#c5cae9')
+GRILLE     = colors.HexColor('#cccccc')
+GRILLE_PRESENCE = colors.HexColor('#9e9e9e')
+TEXTE_GRIS = colors.HexColor('#555')
+TEXTE_PALE = colors.HexColor('#999')
+RAYURE_GROUPE   = colors.HexColor('#f8f9ff')
+RAYURE_PRESENCE = colors.HexColor('#fafafa')
+
+VERT,   VERT_FOND   = colors.HexColor('#276749'), colors.HexColor('#c6f6d5')
+ROUGE,  ROUGE_FOND  = colors.HexColor('#c53030'), colors.HexColor('#fed7d7')
+ORANGE, ORANGE_FOND = colors.HexColor('#7b341e'), colors.HexColor('#feebc8')
+VIOLET, VIOLET_FOND = colors.HexColor('#553c9a'), colors.HexColor('#e9d8fd')
+BLEU_FOND = colors.HexColor('#bee3f8')
+
+# Teintes de statut : (couleur du texte, police, fond de cellule ou None)
+STATUTS_PAIEMENT = {
+    'Payé':   (VERT, 'Helvetica-Bold', None),
+    'Impayé': (ROUGE, 'Helvetica-Bold', None),
+}
+STATUT_PAIEMENT_AUTRE = (ORANGE, 'Helvetica', None)
+
+STATUTS_PRESENCE = {
+    'P': (VERT, 'Helvetica-Bold', VERT_FOND),
+    'A': (ROUGE, 'Helvetica-Bold', ROUGE_FOND),
+    'R': (ORANGE, 'Helvetica-Bold', ORANGE_FOND),
+    'E': (VIOLET, 'Helvetica-Bold', VIOLET_FOND),
+}
+
+# ─── Styles de paragraphe ─────────────────────────────────────────────────────
+GROUPE_STYLES = {
+    'title': ParagraphStyle('title', fontSize=20, fontName='Helvetica-Bold',
+                            textColor=ENCRE, alignment=TA_CENTER, spaceAfter=6),
+    'sub': ParagraphStyle('sub', fontSize=13, fontName='Helvetica',
+                          textColor=ACCENT, alignment=TA_CENTER, spaceAfter=4),
+    'info': ParagraphStyle('info', fontSize=10, fontName='Helvetica',
+                           textColor=TEXTE_GRIS, alignment=TA_CENTER, spaceAfter=12),
+    'section': ParagraphStyle('section', fontSize=12, fontName='Helvetica-Bold',
+                              textColor=colors.white, alignment=TA_LEFT),
+    'footer': ParagraphStyle('footer', fontSize=8, textColor=TEXTE_PALE, alignment=TA_CENTER),
+}
+
+PRESENCE_STYLES = {
+    'title': ParagraphStyle('title', fontSize=18, fontName='Helvetica-Bold',
+                            textColor=ENCRE, alignment=TA_CENTER, spaceAfter=4),
+    'sub': ParagraphStyle('sub', fontSize=11, fontName='Helvetica',
+                          textColor=ACCENT, alignment=TA_CENTER, spaceAfter=3),
+    'label': ParagraphStyle('label', fontSize=9, fontName='Helvetica-Bold', textColor=ENCRE),
+    'leg': ParagraphStyle('leg', fontSize=8, fontName='Helvetica', textColor=TEXTE_GRIS),
+    'footer': ParagraphStyle('footer', fontSize=7, textColor=TEXTE_PALE, alignment=TA_CENTER),
+}
+
+# ─── Prototypes de tableaux ───────────────────────────────────────────────────
+def entete(fond, taille):
+    # ligne d'en-tête : fond plein, texte blanc gras
+    return [
+        ('BACKGROUND', (0,0), (-1,0), fond),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,0), taille),
+    ]
+
+def rayures(*couleurs, debut=1):
+    # lignes alternées en une seule commande, quel que soit le nombre de lignes
+    return ('ROWBACKGROUNDS', (0,debut), (-1,-1), list(couleurs))
+
+def marges(haut_bas):
+    return [('TOPPADDING', (0,0), (-1,-1), haut_bas), ('BOTTOMPADDING', (0,0), (-1,-1), haut_bas)]
+
+GROUPE_STATS_STYLE = TableStyle(entete(ENCRE, 11) + [
+    ('SPAN', (0,0), (-1,0)),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('BACKGROUND', (0,1), (-1,-1), FOND_DOUX),
+    ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
+    ('FONTSIZE', (0,1), (-1,-1), 10),
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE),
+] + marges(8))
+
+GROUPE_LISTE_STYLE = TableStyle(entete(ACCENT, 10) + [
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
+    ('FONTSIZE', (0,1), (-1,-1), 9),
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE),
+    rayures(colors.white, RAYURE_GROUPE),
+] + marges(6))
+
+GROUPE_REMUNERATION_STYLE = TableStyle(entete(ENCRE, 11) + [
+    ('BACKGROUND', (0,1), (-1,1), FOND_DOUX),
+    ('BACKGROUND', (0,2), (-1,2), VERT_FOND),
+    ('FONTNAME', (0,2), (-1,2), 'Helvetica-Bold'),
+    ('TEXTCOLOR', (0,2), (-1,2), VERT),
+    ('FONTSIZE', (0,1), (-1,-1), 11),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE),
+] + marges(10))
+
+PRESENCE_INFO_STYLE = TableStyle([
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('GRID', (0,0), (-1,-1), 0.5, BORD_INFO),
+    rayures(FOND_DOUX, FOND_DOUX2, debut=0),
+] + marges(5))
+
+PRESENCE_LISTE_STYLE = TableStyle(entete(ENCRE, 10) + [
+    ('ALIGN', (0,0), (-1,0), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
+    ('FONTSIZE', (0,1), (-1,-1), 9),
+    ('ALIGN', (0,1), (0,-1), 'CENTER'),   # N°
+    ('ALIGN', (2,1), (2,-1), 'CENTER'),   # Statut
+    ('ALIGN', (3,1), (3,-1), 'CENTER'),   # Signature
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE_PRESENCE),
+    ('LEFTPADDING', (1,1), (1,-1), 6),
+    rayures(colors.white, RAYURE_PRESENCE),
+])
+
+PRESENCE_STATS_STYLE = TableStyle(entete(ACCENT, 9) + [
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('FONTNAME', (0,1), (-1,1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,1), (-1,1), 12),
+    ('COLBACKGROUNDS', (0,1), (-1,1), [VERT_FOND, ROUGE_FOND, ORANGE_FOND, VIOLET_FOND, BLEU_FOND]),
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE),
+] + marges(7))
+
+PRESENCE_SIGNATURE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), FOND_DOUX2),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,0), 9),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('GRID', (0,0), (-1,-1), 0.5, GRILLE_PRESENCE),
+] + marges(6))
+
+# ─── Colonnes de statut ───────────────────────────────────────────────────────
+def colorer_statuts(table, col, valeurs, teintes, autre=None, debut=1):
+    # Colore la colonne `col` d'après la valeur de chaque ligne. Couleur du
+    # texte, police et fond sont regroupés chacun en plages de lignes
+    # consécutives identiques, une commande par plage. Le nombre de commandes
+    # suit donc le nombre de changements de statut : constant pour une liste
+    # triée par statut, mais jusqu'à trois par ligne quand les statuts
+    # alternent. À appeler après table.setStyle(...) pour passer devant les rayures.
+    lignes = [teintes.get(val, autre) for val in valeurs]
+    commandes = []
+    for attr, nom in enumerate(('TEXTCOLOR', 'FONTNAME', 'BACKGROUND')):
+        courante, premiere = None, debut
+        for i, teinte in enumerate(lignes + [None], debut):
+            valeur = teinte[attr] if teinte is not None else None
+            if valeur != courante:
+                if courante is not None:
+                    commandes.append((nom, (col, premiere), (col, i - 1), courante))
+                courante, premiere = valeur, i
+    if commandes:
+        table.setStyle(commandes)